@@ -11,11 +11,31 @@ from config import RUN_MODE
 
 if __name__ == '__main__':
     if RUN_MODE == "direct":
-        from models.custom_agent.bot import run_once
+        from config import NEWS_STREAM
+        from models.custom_agent.bot import run_once, NewsStream
         from app.post import auto_post
-        print("[+] Collecting authentic news context...")
-        news_items = run_once()
-        auto_post(news_items=news_items)
+        from app.journal import pending_run
+        from metrics import end_run
+        journal = pending_run()
+        if journal:
+            auto_post(journal=journal)
+        elif NEWS_STREAM:
+            print("[+] Collecting authentic news context (generation starts as it arrives)...")
+            news = NewsStream()
+            try:
+                auto_post(news_items=news)
+            finally:
+                news.close()
+        else:
+            print("[+] Collecting authentic news context...")
+            news_items = run_once()
+            auto_post(news_items=news_items)
+        end_run("direct")
+    elif RUN_MODE == "batch":
+        from app.batch import run_batch
+        from metrics import end_run
+        rows = run_batch()
+        end_run("batch", jobs=len(rows))
     else:
         from app.scheduler import run
         run()
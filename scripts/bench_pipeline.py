@@ -0,0 +1,417 @@
+"""
+Offline end-to-end benchmark: collect() -> generate_ai_content() -> auto_post() against local
+stand-ins, reporting per-phase wall time, throughput and peak memory as JSON. The same scan is
+also run through stream_collect() to report the time to its first item.
+
+One local HTTP server plays every remote service:
+  /feed/<n>.xml                      RSS feeds (synthetic, or recorded *.xml from --fixtures)
+  /article/<n>/<m>.html              article pages (synthetic, or recorded *.html from --fixtures)
+  /v1/chat/completions               OpenAI-compatible chat completions (streaming and not)
+  /v1beta/models/<m>:generateContent Gemini-compatible generateContent / streamGenerateContent
+  /v3/blogs/<id>/posts               Blogger posts.insert
+
+LLM stand-ins take --latency seconds before the first byte, then emit at --tokens-per-sec, and
+fail with --error-rate (half 429 with Retry-After, half 500). Reply length follows the word count
+the prompt asks for, scaled by --size.
+
+Nothing leaves the machine: caches, journals and state files go to a temp directory.
+Every article is served from 127.0.0.1, so EXTRACT_PER_HOST caps extraction concurrency; set it
+in the environment to emulate many sites.
+
+Usage: python scripts/bench_pipeline.py [--feeds 20] [--provider openai] [--out report.json] ...
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+VOCAB = ("students scholarship university research funding international campus technology "
+         "software device policy ministry announced results program deadline review global "
+         "learning teachers innovation laptop smartphone grant applicants schools").split()
+TITLE_WORDS = ["scholarship", "university", "technology", "gadget", "international", "education",
+               "smartphone", "funding", "students", "AI"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--feeds", type=int, default=20, help="synthetic feeds")
+    p.add_argument("--items", type=int, default=30, help="entries per synthetic feed")
+    p.add_argument("--article-words", type=int, default=900, help="words per synthetic article")
+    p.add_argument("--dup-rate", type=float, default=0.0,
+                   help="share of synthetic entries that re-report a story from another feed")
+    p.add_argument("--fixtures", help="directory of recorded feeds (*.xml) and articles (*.html)")
+    p.add_argument("--provider", choices=("openai", "gemini", "both"), default="openai")
+    p.add_argument("--latency", type=float, default=0.3, help="seconds before an LLM reply starts")
+    p.add_argument("--tokens-per-sec", type=float, default=400.0, help="LLM output rate (0 = instant)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls that fail")
+    p.add_argument("--size", type=float, default=1.0, help="reply length vs. the words the prompt asks for")
+    p.add_argument("--stream", choices=("true", "false"), help="override AI_STREAM")
+    p.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows Python down)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="also write the JSON report here")
+    return p.parse_args()
+
+
+# --- fixtures --------------------------------------------------------------------
+
+class Fixtures:
+    """Feeds and articles served by the stand-in, keyed by request path."""
+
+    def __init__(self, args, base):
+        self.rng = random.Random(args.seed)
+        self.base = base
+        self.pages = {}
+        if args.fixtures:
+            self._load(Path(args.fixtures))
+        else:
+            self._synthesize(args)
+        self.feeds = sorted(p for p in self.pages if p.startswith("/feed/"))
+
+    def _load(self, root):
+        """Recorded feeds are rewritten so entry links point at the stand-in (recorded articles
+        served round-robin) and dates fall in 2026, which collect() requires."""
+        articles = [p.read_bytes() for p in sorted(root.glob("*.html"))] or [b"<html><body></body></html>"]
+        for n, path in enumerate(sorted(root.glob("*.xml"))):
+            xml = path.read_text(encoding="utf-8", errors="replace")
+            links = iter(range(10 ** 6))
+
+            def local(m, n=n):
+                k = next(links)
+                self.pages[f"/article/{n}/{k}.html"] = ("text/html", articles[k % len(articles)])
+                return f'{m.group(1)}{self.base}/article/{n}/{k}.html{m.group(3)}'
+
+            xml = re.sub(r'(<link>)(.*?)(</link>)', local, xml)
+            xml = re.sub(r'(<link[^>]*href=")([^"]*)(")', local, xml)
+            xml = re.sub(r'(<(?:pubDate|published|updated|dc:date)>[^<]*?)\b(?:19|20)\d\d\b', r'\g<1>2026', xml)
+            self.pages[f"/feed/{n}.xml"] = ("application/rss+xml", xml.encode())
+
+    def _words(self, n, story=()):
+        """n words, half of them (when given) from the story's own vocabulary so that distinct
+        stories do not look alike to near-duplicate detection."""
+        rng = self.rng
+        return " ".join(rng.choice(story) if story and rng.random() < 0.5 else rng.choice(VOCAB) for _ in range(n))
+
+    def _reword(self, text, rate=0.03):
+        """`text` as another outlet would run it: the same copy with a few words changed."""
+        rng = self.rng
+        return " ".join(rng.choice(VOCAB) if rng.random() < rate else w for w in text.split())
+
+    def _synthesize(self, args):
+        now = datetime(2026, 6, 1, 12, tzinfo=timezone.utc)
+        stories = []
+        for n in range(args.feeds):
+            items = []
+            for m in range(args.items):
+                if stories and self.rng.random() < args.dup_rate:
+                    # same event, another outlet
+                    headline, description, paras = (self._reword(t) for t in self.rng.choice(stories))
+                else:
+                    story = [f"e{n}x{m}w{i}" for i in range(30)]
+                    headline, description = self._words(6, story), self._words(40, story)
+                    paras = " ".join(self._words(60, story) for _ in range(max(1, args.article_words // 60)))
+                    stories.append((headline, description, paras))
+                title = f"{self.rng.choice(TITLE_WORDS).title()} update {n}-{m}: {headline}"
+                published = format_datetime(now - timedelta(minutes=7 * (n * args.items + m)))
+                link = f"{self.base}/article/{n}/{m}.html"
+                items.append(
+                    f"<item><title>{title}</title><link>{link}</link><guid>{link}</guid>"
+                    f"<pubDate>{published}</pubDate><description>{description}</description></item>")
+                words = paras.split()
+                paras = "".join(f"<p>{' '.join(words[i:i + 60])}</p>" for i in range(0, len(words), 60))
+                self.pages[f"/article/{n}/{m}.html"] = ("text/html", (
+                    f"<html><head><title>{title}</title></head><body><nav>Home | World | Tech</nav>"
+                    f"<article><h1>{title}</h1>{paras}</article><footer>(c) 2026</footer></body></html>"
+                ).encode())
+            self.pages[f"/feed/{n}.xml"] = ("application/rss+xml", (
+                f'<?xml version="1.0"?><rss version="2.0"><channel><title>Bench feed {n}</title>'
+                f"<link>{self.base}/</link><description>bench</description>{''.join(items)}</channel></rss>"
+            ).encode())
+
+
+# --- stand-in server -------------------------------------------------------------
+
+class StandIn:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed + 1)
+        self.rng_lock = threading.Lock()
+        self.requests = Counter()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.fixtures = Fixtures(args, self.base)
+        self.posts = 0
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    # LLM reply bodies --------------------------------------------------------
+
+    def _fail(self):
+        with self.rng_lock:
+            roll = self.rng.random()
+        if roll >= self.args.error_rate:
+            return None
+        return 429 if roll < self.args.error_rate / 2 else 500
+
+    def _reply(self, prompt):
+        """JSON text answering an outline or section prompt."""
+        rng = random.Random(prompt)
+        words = lambda n: " ".join(rng.choice(VOCAB) for _ in range(max(1, int(n * self.args.size))))
+        m = re.search(r"EXACTLY (\d+) sections", prompt)
+        if "[MODE: OUTLINE]" in prompt:
+            n = int(m.group(1)) if m else 10
+            return json.dumps({"topic": "Bench", "sections": [f"Section {i} {words(3)}" for i in range(1, n + 1)]})
+        m = re.search(r"(\d+)\+?-word", prompt)
+        n = int(m.group(1)) if m else 300
+        paras = "".join(f'<p style="text-align: justify;">{words(min(60, n - i))}</p>' for i in range(0, n, 60))
+        return json.dumps({"title": f"Bench post {words(4)}", "content": f"<h2>{words(4)}</h2>{paras}",
+                           "labels": ["bench", "education"]})
+
+    def _chunks(self, text):
+        """Split text into ~4-char tokens grouped per chunk, pacing them at --tokens-per-sec."""
+        step = 40
+        delay = (step / 4) / self.args.tokens_per_sec if self.args.tokens_per_sec else 0
+        for i in range(0, len(text), step):
+            if delay:
+                time.sleep(delay)
+            yield text[i:i + step]
+
+    # request handling --------------------------------------------------------
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def _send(self, status, body, ctype="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _sse(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+
+            def do_GET(self):
+                page = standin.fixtures.pages.get(self.path.split("?")[0])
+                standin.requests["feed" if self.path.startswith("/feed/") else "article"] += 1
+                if not page:
+                    return self._send(404, b"not found", "text/plain")
+                self._send(200, page[1], page[0])
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                path = self.path.split("?")[0]
+                if path.endswith("/posts"):
+                    standin.requests["blogger"] += 1
+                    standin.posts += 1
+                    out = {"id": str(standin.posts), "url": f"{standin.base}/post/{standin.posts}", **body}
+                    return self._send(200, json.dumps(out).encode())
+                provider = "openai" if path.startswith("/v1/chat") else "gemini"
+                standin.requests[provider] += 1
+                time.sleep(standin.args.latency)
+                status = standin._fail()
+                if status:
+                    standin.requests[f"{provider}_{status}"] += 1
+                    err = json.dumps({"error": {"code": status, "message": "stand-in failure", "status": "UNAVAILABLE"}})
+                    return self._send(status, err.encode(), headers={"Retry-After": "1"} if status == 429 else None)
+                if provider == "openai":
+                    self._openai(body)
+                else:
+                    self._gemini(body, stream="streamGenerateContent" in path)
+
+            def _openai(self, body):
+                prompt = body["messages"][-1]["content"]
+                text = standin._reply(prompt)
+                usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                         "total_tokens": (len(prompt) + len(text)) // 4}
+                base = {"id": "bench", "created": 0, "model": body.get("model", "bench")}
+                if not body.get("stream"):
+                    out = {**base, "object": "chat.completion", "usage": usage, "choices": [{
+                        "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}]}
+                    return self._send(200, json.dumps(out).encode())
+                events = ({**base, "object": "chat.completion.chunk", "choices": [{
+                    "index": 0, "finish_reason": None, "delta": {"content": chunk}}]} for chunk in standin._chunks(text))
+                self._sse(list_then(events, {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def _gemini(self, body, stream):
+                prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+                text = standin._reply(prompt)
+                usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                         "totalTokenCount": (len(prompt) + len(text)) // 4}
+
+                def chunk(t, final=False):
+                    out = {"candidates": [{"content": {"role": "model", "parts": [{"text": t}]}, "index": 0}]}
+                    if final:
+                        out["candidates"][0]["finishReason"] = "STOP"
+                        out["usageMetadata"] = usage
+                    return out
+
+                if not stream:
+                    return self._send(200, json.dumps(chunk(text, True)).encode())
+                self._sse(list_then((chunk(c) for c in standin._chunks(text)), chunk("", True)))
+
+        return Handler
+
+
+def list_then(events, last):
+    yield from events
+    yield last
+
+
+# --- measurement -----------------------------------------------------------------
+
+def measure(name, fn, memory, report):
+    if memory:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - start
+    entry = {"wall_s": round(wall, 3)}
+    if memory:
+        entry["peak_mb"] = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 2)
+    report["phases"][name] = entry
+    print(f"[+] {name}: {wall:.2f}s")
+    return result, entry
+
+
+def configure_env(args, standin, tmp):
+    """Point every setting at the stand-in and the temp dir before the app modules load."""
+    creds = Path(tmp) / "credentials.json"
+    creds.write_text("{}")
+    env = {
+        "NEWS_SOURCES": ",".join(standin.base + p for p in standin.fixtures.feeds),
+        "OPENAI_API_KEY": "sk-bench" if args.provider in ("openai", "both") else "",
+        "GEMINI_API_KEY": "bench" if args.provider in ("gemini", "both") else "",
+        "OPENAI_BASE_URL": standin.base + "/v1",
+        "GOOGLE_GEMINI_BASE_URL": standin.base,
+        "BLOGGER_API_ENDPOINT": standin.base + "/",
+        "CREDENTIALS_FILE": str(creds),
+        "TOKEN_FILE": str(Path(tmp) / "token.json"),
+        "RUNS_DIR": str(Path(tmp) / "runs"),
+        "NEWS_STORE_FILE": str(Path(tmp) / "news.sqlite"),
+        "FEED_STATE_FILE": str(Path(tmp) / "feed_state.json"),
+        "EXTRACT_CACHE_FILE": str(Path(tmp) / "extract_cache.sqlite"),
+        "SEEN_INDEX_FILE": str(Path(tmp) / "seen.sqlite"),
+        "AI_CACHE_FILE": str(Path(tmp) / "ai_cache.sqlite"),
+        "EXTRACT_CACHE": "false",
+        "AI_CACHE": "false",
+        "DEDUPE_ACROSS_RUNS": "false",
+        "FORCE_POST": "true",
+        "LOG_VERBOSE": os.environ.get("LOG_VERBOSE", "false"),
+    }
+    if args.stream:
+        env["AI_STREAM"] = args.stream
+    os.environ.update(env)
+
+
+def main():
+    args = parse_args()
+    standin = StandIn(args)
+    standin.start()
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    configure_env(args, standin, tmp)
+    if str(SRC) not in sys.path:
+        sys.path.insert(0, str(SRC))
+
+    from google.oauth2.credentials import Credentials
+    from models.custom_agent.bot import collect, stream_collect
+    from app import publisher
+    from app.journal import RunJournal
+    from app.post import generate_ai_content, auto_post
+    import config
+    from metrics import METRICS
+
+    # A bearer token the stand-in accepts; skips the OAuth browser flow.
+    pub = publisher.get_publisher()
+    pub._creds = Credentials(token="bench")
+
+    report = {
+        "python": platform.python_version(),
+        "args": vars(args),
+        "sources": len(standin.fixtures.feeds),
+        "phases": {},
+    }
+    if not args.no_memory:
+        tracemalloc.start()
+
+    items, entry = measure("collect", collect, not args.no_memory, report)
+    entry.update(items=len(items), feeds_per_s=round(len(standin.fixtures.feeds) / entry["wall_s"], 2),
+                 articles_fetched=standin.requests["article"],
+                 items_per_s=round(len(items) / entry["wall_s"], 2))
+
+    def stream():
+        start, first, got = time.perf_counter(), None, []
+        for item in stream_collect():
+            first = first or time.perf_counter() - start
+            got.append(item)
+        return got, first
+
+    articles_before = standin.requests["article"]
+    (streamed, first), entry = measure("stream_collect", stream, not args.no_memory, report)
+    entry.update(items=len(streamed), first_item_s=round(first or 0, 3),
+                 articles_fetched=standin.requests["article"] - articles_before)
+
+    topic = config.TOPICS[0]
+    journal = RunJournal.create(topic, items)
+    calls_before = sum(standin.requests[p] for p in ("openai", "gemini"))
+    data, entry = measure("generate", lambda: generate_ai_content(topic, items, journal),
+                          not args.no_memory, report)
+    calls = sum(standin.requests[p] for p in ("openai", "gemini")) - calls_before
+    words = data.get("words") or 0
+    entry.update(llm_calls=calls, words=words, words_per_s=round(words / entry["wall_s"], 1))
+
+    result, entry = measure("publish", lambda: auto_post(journal=journal), not args.no_memory, report)
+    entry.update(posted=bool(result))
+
+    if not args.no_memory:
+        tracemalloc.stop()
+    report["total_s"] = round(sum(p["wall_s"] for p in report["phases"].values()), 3)
+    report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    report["requests"] = dict(standin.requests)
+    report["metrics"] = METRICS.snapshot(config.AI_PRICES)
+    standin.stop()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
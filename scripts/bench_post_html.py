@@ -0,0 +1,107 @@
+"""
+Benchmark: assembling a ~12k-word post with the single-pass PostBuilder vs the original
+four regex passes per section plus repeated whole-post word counts, and truncating it to
+10k words with truncate_html vs the old strip-everything truncation.
+Usage: python scripts/bench_post_html.py [repeats] [words]
+"""
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# Add src to path
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from app.html_post import PostBuilder, truncate_html
+
+TOC = "\n\n<!--- TABLE OF CONTENT START 2215587-->\n<script>mbtTOC();</script>\n<!--- TABLE OF CONTENT END 2215587-->"
+
+
+def legacy_word_count(html):
+    return len(re.sub(r"<[^>]+>", " ", html or "").split())
+
+
+def legacy_clean(content):
+    content = re.sub(r'<table.*?</table>', '', content, flags=re.DOTALL | re.IGNORECASE)
+    content = re.sub(r'<div class="mbtTOC".*?</div>', '', content, flags=re.DOTALL | re.IGNORECASE)
+    content = re.sub(r'<script>mbtTOC.*?</script>', '', content, flags=re.DOTALL | re.IGNORECASE)
+    content = re.sub(r'<!---.*?--->', '', content, flags=re.DOTALL | re.IGNORECASE)
+    return content
+
+
+def legacy_assemble(header, sections):
+    """What generate_ai_content + prepare_post used to do (truncation check included)."""
+    full_html = header
+    for name, content in sections:
+        full_html += f"\n\n<!-- Section: {name} -->\n" + legacy_clean(content)
+    if legacy_word_count(full_html) < 100:
+        pass
+    full_html += TOC
+    legacy_word_count(full_html)  # MSG_COMPLETE log
+    legacy_word_count(full_html)  # prepare_post min/max check
+    legacy_word_count(full_html)  # _truncate_to_words
+    return full_html
+
+
+def legacy_truncate(html, max_words):
+    if legacy_word_count(html) <= max_words:
+        return html
+    words = re.sub(r"<[^>]+>", " ", html).split()[:max_words]
+    return "<p>" + " ".join(words) + "</p>"
+
+
+def new_assemble(header, sections):
+    post = PostBuilder()
+    post.add(header, clean=False)
+    for name, content in sections:
+        post.add(f"\n\n<!-- Section: {name} -->\n", clean=False)
+        post.add(content)
+    post.add(TOC, clean=False)
+    return post.html(), post.words
+
+
+def make_section(words, rng):
+    vocab = ("students scholarship deadline announced university program applicants tuition "
+             "research grant international campus faculty policy results semester").split()
+    paras = []
+    while words > 0:
+        n = min(words, rng.randint(40, 90))
+        text = " ".join(rng.choice(vocab) for _ in range(n))
+        paras.append(f'<p style="text-align: justify;">{text} <a href="https://example.com/{n}">source</a></p>')
+        words -= n + 1
+    paras.insert(len(paras) // 2, "<table><tr><td>Date</td><td>Event</td></tr></table>")
+    paras.append('<div class="mbtTOC"><button>Contents</button></div><!--- note --->')
+    return "<h2>Section</h2>\n" + "\n".join(paras)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 12000
+    rng = random.Random(7)
+    n_sections = 12
+    header = "<h1>Title</h1>" + make_section(total // n_sections, rng)
+    sections = [(f"Part {i}", make_section(total // n_sections, rng)) for i in range(2, n_sections + 1)]
+
+    legacy_html = legacy_assemble(header, sections)
+    html, words = new_assemble(header, sections)
+    assert html == legacy_html, "outputs differ"
+    assert words == legacy_word_count(legacy_html), (words, legacy_word_count(legacy_html))
+
+    legacy = timeit.timeit(lambda: legacy_assemble(header, sections), number=repeats) / repeats * 1e3
+    single = timeit.timeit(lambda: new_assemble(header, sections), number=repeats) / repeats * 1e3
+    print(f"post: {words} words, {len(html) // 1024} KiB, {n_sections} sections")
+    print(f"legacy (4 regex passes/section + 3 full recounts): {legacy:8.2f} ms")
+    print(f"single-pass PostBuilder:                          {single:8.2f} ms")
+
+    limit = words * 5 // 6
+    legacy = timeit.timeit(lambda: legacy_truncate(html, limit), number=repeats) / repeats * 1e3
+    single = timeit.timeit(lambda: truncate_html(html, limit), number=repeats) / repeats * 1e3
+    print(f"truncate to {limit} words: legacy {legacy:.2f} ms (kept {legacy_word_count(legacy_truncate(html, limit))} words, "
+          f"no markup), truncate_html {single:.2f} ms (kept {truncate_html(html, limit)[1]} words)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Microbenchmark: compiled TopicMatcher vs the original per-keyword substring loop.
+
+"legacy" is the original boolean check, which stops at the first topic with a substring hit;
+"legacy counts" is the same loop producing the per-topic counts TopicMatcher returns.
+Usage: python scripts/bench_topic_matcher.py [repeats]
+"""
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Add src to path
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from models.custom_agent.config import TOPIC_KEYWORDS
+from models.custom_agent.topics import MATCHER
+
+
+def legacy_matches_topic(text):
+    """The pre-matcher implementation: lowercase + `in` for every keyword of every topic."""
+    t = (text or "").lower()
+    for major_topic, keywords in TOPIC_KEYWORDS.items():
+        if any(kw.lower() in t for kw in keywords):
+            return True
+    return False
+
+
+def legacy_topic_counts(text):
+    """Per-topic hit counts with the original substring semantics (every keyword scanned)."""
+    t = (text or "").lower()
+    return {topic: sum(t.count(kw.lower()) for kw in keywords) for topic, keywords in TOPIC_KEYWORDS.items()}
+
+
+def make_text(words, on_topic, rng):
+    vocab = ("the market rallied after officials announced new measures for households and "
+             "companies across several regions while analysts debated longer term effects").split()
+    out = [rng.choice(vocab) for _ in range(words)]
+    if on_topic:
+        out[rng.randrange(words)] = "scholarship"
+    return " ".join(out)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(42)
+    samples = {
+        "title (12 words, off-topic)": make_text(12, False, rng),
+        "article (1500 words, off-topic)": make_text(1500, False, rng),
+        "article (1500 words, on-topic)": make_text(1500, True, rng),
+    }
+    print(f"{'input':34} {'legacy us':>10} {'legacy counts us':>17} {'matcher us':>11} {'legacy hit':>11} "
+          f"{'matcher hits'}")
+    for name, text in samples.items():
+        legacy = timeit.timeit(lambda: legacy_matches_topic(text), number=repeats) / repeats * 1e6
+        counts = timeit.timeit(lambda: legacy_topic_counts(text), number=repeats) / repeats * 1e6
+        compiled = timeit.timeit(lambda: MATCHER.counts(text), number=repeats) / repeats * 1e6
+        print(f"{name:34} {legacy:10.1f} {counts:17.1f} {compiled:11.1f} {str(legacy_matches_topic(text)):>11} "
+              f"{dict(MATCHER.counts(text))}")
+
+
+if __name__ == "__main__":
+    main()
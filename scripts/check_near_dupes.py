@@ -0,0 +1,86 @@
+"""
+Check near-duplicate detection on templated posts and on real duplicates.
+
+Posts built from one template (the same scholarship blurb for another university) are
+different stories and must all be kept; the same wire story republished with a few edits
+must be folded into one. Exits non-zero when either case goes wrong.
+Usage: python scripts/check_near_dupes.py
+"""
+import sys
+from pathlib import Path
+
+# Add src to path
+src_path = str(Path(__file__).resolve().parent.parent / "src")
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from models.custom_agent.config import NEAR_DUP_THRESHOLD
+from models.custom_agent.near_dupes import NearDuplicates
+
+TEMPLATE_TITLE = "{uni} Scholarships {year} in {country} (Fully Funded)"
+TEMPLATE_TEXT = (
+    "The {uni} in {country} is offering fully funded scholarships for international students for the"
+    " {year} intake. The scholarship covers full tuition fees, a monthly stipend of {amount} and health"
+    " insurance. Applicants must hold a bachelor's degree and meet the English language requirements of"
+    " {uni}. Master's and PhD programs in {fields} are eligible. The application deadline is {deadline}."
+    " Apply online through the official {uni} portal and submit your transcripts, CV and two reference"
+    " letters."
+)
+TEMPLATED = [
+    dict(uni="University of Sydney", country="Australia", year="2026", amount="AUD 3,000",
+         fields="engineering and health sciences", deadline="30 September 2026"),
+    dict(uni="University of Toronto", country="Canada", year="2026", amount="CAD 2,500",
+         fields="business, law and computer science", deadline="15 January 2027"),
+    dict(uni="ETH Zurich", country="Switzerland", year="2026", amount="CHF 1,200",
+         fields="natural sciences and architecture", deadline="15 December 2026"),
+]
+
+STORY = {
+    "source": "Wire",
+    "title": "Central bank raises interest rates to curb inflation",
+    "content": (
+        "The central bank raised its benchmark interest rate by a quarter point on Wednesday, the third"
+        " increase this year, as policymakers try to bring inflation back toward their two percent target."
+        " Officials said price growth remained too high and signalled that further tightening could follow"
+        " if wages keep rising. Markets had largely expected the move, and bond yields edged higher after"
+        " the announcement. The governor told reporters that the labour market was still strong but that"
+        " the bank would watch household spending closely over the coming months."
+    ),
+}
+REPRINT = {
+    "source": "Daily",
+    "title": "Central bank lifts interest rates again to curb inflation",
+    "content": (
+        "The central bank raised its benchmark interest rate by a quarter point on Wednesday, its third"
+        " increase this year, as policymakers try to bring inflation back toward their 2% target."
+        " Officials said price growth remained too high and signalled that further tightening could follow"
+        " if wages keep rising. Investors had largely expected the move, and bond yields edged higher after"
+        " the announcement. The governor told journalists that the labour market was still strong but that"
+        " the bank would watch household spending closely in the coming months."
+    ),
+}
+
+
+def main():
+    failed = False
+    dupes = NearDuplicates(NEAR_DUP_THRESHOLD)
+    merged = [dupes.add({"source": s["uni"], "title": TEMPLATE_TITLE.format(**s), "content": TEMPLATE_TEXT.format(**s)})
+              is not None for s in TEMPLATED]
+    if any(merged):
+        print(f"[!] Templated posts merged: {merged}")
+        failed = True
+    else:
+        print(f"[+] {len(TEMPLATED)} templated posts kept apart")
+
+    dupes = NearDuplicates(NEAR_DUP_THRESHOLD)
+    dupes.add(dict(STORY))
+    if dupes.add(dict(REPRINT)) is None:
+        print("[!] Reworded copy of a story was not merged")
+        failed = True
+    else:
+        print("[+] Reworded copy merged into the original story")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
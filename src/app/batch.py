@@ -0,0 +1,224 @@
+"""Batch mode: many posts (topic x blog) from one news collection, via a persistent job queue."""
+import os
+import sqlite3
+import threading
+import time
+
+from config import (
+    TOPICS, BLOG_IDS, BATCH_WORKERS, BATCH_POSTS, BATCH_QUEUE_FILE, BATCH_MAX_ATTEMPTS, BATCH_PUBLISH_TOGETHER,
+)
+from metrics import METRICS
+from .journal import RunJournal
+from .post import auto_post, prepare_post, post_many_to_blogger, mark_news_used
+
+PENDING, RUNNING, READY, DONE, SKIPPED, FAILED = "pending", "running", "ready", "done", "skipped", "failed"
+
+
+class JobQueue:
+    """SQLite-backed FIFO of post jobs; safe to share between worker threads."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, blog_id TEXT NOT NULL,"
+            " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, run_id TEXT, url TEXT,"
+            " error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id)")
+        self._db.commit()
+
+    def recover(self):
+        """Jobs left 'running' (or generated but never published) by a crashed process go back to the queue."""
+        with self._lock:
+            n = self._db.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE status IN (?, ?)", (PENDING, time.time(), RUNNING, READY)
+            ).rowcount
+            self._db.commit()
+        return n
+
+    def pending_ids(self):
+        with self._lock:
+            rows = self._db.execute("SELECT id FROM jobs WHERE status = ? ORDER BY id", (PENDING,)).fetchall()
+        return [r[0] for r in rows]
+
+    def enqueue(self, jobs):
+        """jobs: iterable of (topic, blog_id). Returns the new job IDs."""
+        now = time.time()
+        ids = []
+        with self._lock:
+            for topic, blog_id in jobs:
+                cur = self._db.execute(
+                    "INSERT INTO jobs (topic, blog_id, status, created, updated) VALUES (?, ?, ?, ?, ?)",
+                    (topic, blog_id, PENDING, now, now),
+                )
+                ids.append(cur.lastrowid)
+            self._db.commit()
+        return ids
+
+    def claim(self):
+        """Atomically take the oldest pending job as a dict, or None when the queue is empty."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, topic, blog_id, attempts, run_id FROM jobs WHERE status = ? ORDER BY id LIMIT 1",
+                (PENDING,),
+            ).fetchone()
+            if not row:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                (RUNNING, time.time(), row[0]),
+            )
+            self._db.commit()
+        return {"id": row[0], "topic": row[1], "blog_id": row[2], "attempts": row[3] + 1, "run_id": row[4]}
+
+    def update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def report(self, ids):
+        """Per-job status rows for `ids`."""
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, topic, blog_id, status, attempts, url, error FROM jobs"
+                f" WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", tuple(ids)
+            ).fetchall()
+        keys = ("id", "topic", "blog_id", "status", "attempts", "url", "error")
+        return [dict(zip(keys, r)) for r in rows]
+
+
+def plan_jobs(n=None, topics=None, blogs=None):
+    """Every topic x blog pair, or the first n of them when n is given.
+
+    Each pair is queued at most once: a second job for the same topic and blog would only
+    publish the same post again.
+    """
+    pairs = [(t, b) for t in (topics or TOPICS) for b in (blogs or BLOG_IDS)]
+    if n and n > len(pairs):
+        print(f"[~] Only {len(pairs)} distinct topic/blog pairs; queueing {len(pairs)} jobs instead of {n}")
+    return pairs[:n] if n else pairs
+
+
+def _end_job(queue, job, journal, status, **fields):
+    """Record a job's final status. Its journal only served retries, so it is deleted."""
+    queue.update(job["id"], status=status, run_id=None, **fields)
+    journal.delete()
+
+
+def _run_job(queue, job, news, ready=None):
+    journal = None
+    if job["run_id"]:
+        try:
+            journal = RunJournal.open(job["run_id"])  # retry of an earlier attempt: resume its checkpoints
+        except (OSError, ValueError):
+            journal = None
+    if journal is None:
+        journal = RunJournal.create(job["topic"], news(), job_id=job["id"])
+        queue.update(job["id"], run_id=journal.run_id)
+    print(f"[+] Job {job['id']}: '{job['topic']}' -> blog {job['blog_id']} (attempt {job['attempts']})")
+    try:
+        if ready is not None:
+            journal, post = prepare_post(journal=journal)
+            if post:
+                ready.append((job, journal, dict(post, blog_id=job["blog_id"])))
+                queue.update(job["id"], status=READY, error=None)
+                return
+            result = None
+        else:
+            result = auto_post(journal=journal, blog_id=job["blog_id"])
+    except Exception as e:
+        retry = job["attempts"] < BATCH_MAX_ATTEMPTS
+        print(f"[!] Job {job['id']} raised: {e}" + (" (will retry)" if retry else ""))
+        if retry:
+            queue.update(job["id"], status=PENDING, error=str(e)[:500])
+        else:
+            _end_job(queue, job, journal, FAILED, error=str(e)[:500])
+        return
+    if result:
+        _end_job(queue, job, journal, DONE, url=result.get("url"), error=None)
+    elif journal.status == "skipped":
+        _end_job(queue, job, journal, SKIPPED, error="below BLOG_POST_MIN_WORDS")
+    else:
+        _end_job(queue, job, journal, FAILED, error="not published")
+
+
+def _publish_ready(queue, ready):
+    """Publish every generated post with one Blogger batch request."""
+    if not ready:
+        return
+    print(f"[+] Publishing {len(ready)} posts in one batch request")
+    try:
+        results = post_many_to_blogger([post for _, _, post in ready])
+    except Exception as e:
+        print(f"[!] Batch publish failed: {e}")
+        results = [None] * len(ready)
+    for (job, journal, _), result in zip(ready, results):
+        if result:
+            journal.finish("posted")
+            mark_news_used(journal)
+            _end_job(queue, job, journal, DONE, url=result.get("url"), error=None)
+        else:
+            _end_job(queue, job, journal, FAILED, error="not published")
+
+
+def run_batch(n=None, topics=None, blogs=None, workers=None, publish_together=None):
+    """Enqueue a batch (unless an interrupted one is still pending) and drain it with a worker pool.
+
+    News is collected once, on first need, and shared by every job; provider clients and rate
+    limiters are process-wide, so workers share them too. With publish_together (default
+    BATCH_PUBLISH_TOGETHER) posts are only generated by the workers and then published together
+    in a single Blogger batch request.
+    """
+    from models.custom_agent.bot import run_once
+
+    queue = JobQueue(BATCH_QUEUE_FILE)
+    recovered = queue.recover()
+    ids = queue.pending_ids()
+    if ids:
+        print(f"[+] Resuming {len(ids)} queued jobs ({recovered} were interrupted)")
+    else:
+        ids = queue.enqueue(plan_jobs(n or BATCH_POSTS or None, topics, blogs))
+        print(f"[+] Queued {len(ids)} jobs")
+
+    news_lock = threading.Lock()
+    news_cache = []
+
+    def news():
+        with news_lock:
+            if not news_cache:
+                print("[+] Collecting authentic news context (shared by all jobs)...")
+                news_cache.append(run_once())
+            return news_cache[0]
+
+    together = BATCH_PUBLISH_TOGETHER if publish_together is None else publish_together
+    ready = [] if together else None
+
+    def worker():
+        while True:
+            job = queue.claim()
+            if job is None:
+                return
+            _run_job(queue, job, news, ready)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=METRICS.bind(worker), name=f"batch-{i}") for i in range(max(1, workers or BATCH_WORKERS))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if together:
+        _publish_ready(queue, ready)
+
+    rows = queue.report(ids)
+    print(f"\n[+] Batch finished in {time.monotonic() - start:.0f}s")
+    for r in rows:
+        detail = r["url"] or r["error"] or ""
+        print(f"  #{r['id']:<4} {r['status']:<8} {r['topic'][:30]:<30} blog {r['blog_id']}  {detail}")
+    return rows
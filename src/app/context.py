@@ -0,0 +1,95 @@
+"""Pick the news items most relevant to each prompt (BM25 over title + article text)."""
+import math
+import re
+from collections import Counter
+
+from config import CONTEXT_TOP_K, CONTEXT_TOKEN_BUDGET, CONTEXT_SNIPPET_CHARS
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "about after how into new not over what when which who why more most their they than".split()
+)
+CONTEXT_HEADER = "\n\nUSE THE FOLLOWING REAL-TIME NEWS AS YOUR PRIMARY SOURCE AND EVIDENCE:\n"
+
+
+def _stem(t):
+    # Plural folding is enough for headline-vs-section-title matching.
+    return t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+
+
+def _tokens(text):
+    return [_stem(t) for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+class NewsIndex:
+    """BM25 index over collected news items; citation numbers are stable across prompts.
+
+    `used` collects the indices of every item context() has put into a prompt.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, items):
+        self.items = list(items or [])
+        self.used = set()
+        # Title counts double: it is the densest summary of what the story is about.
+        self._docs = [
+            Counter(_tokens(it.get("title")) * 2 + _tokens((it.get("content") or "")[:4000]))
+            for it in self.items
+        ]
+        self._lens = [sum(d.values()) for d in self._docs]
+        self._avg = (sum(self._lens) / len(self._lens)) if self._lens else 0.0
+        df = Counter(t for d in self._docs for t in d)
+        n = len(self._docs)
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query):
+        q = set(_tokens(query))
+        out = []
+        for doc, length in zip(self._docs, self._lens):
+            score = 0.0
+            norm = self.K1 * (1 - self.B + self.B * length / self._avg) if self._avg else self.K1
+            for t in q:
+                tf = doc.get(t)
+                if tf:
+                    score += self._idf[t] * tf * (self.K1 + 1) / (tf + norm)
+            out.append(score)
+        return out
+
+    def select(self, query=None, k=CONTEXT_TOP_K, token_budget=CONTEXT_TOKEN_BUDGET):
+        """Indices of the k best items for `query` that fit the token budget (~4 chars/token).
+
+        Without a query, or when nothing matches, items are taken in collection order.
+        """
+        order = list(range(len(self.items)))
+        if query:
+            scores = self.scores(query)
+            ranked = [i for i in sorted(order, key=lambda i: -scores[i]) if scores[i] > 0]
+            order = ranked or order
+        chosen, used = [], 0
+        for i in order:
+            cost = len(self.line(i)) // 4
+            if chosen and used + cost > token_budget:
+                break
+            chosen.append(i)
+            used += cost
+            if len(chosen) >= k:
+                break
+        return sorted(chosen)
+
+    def line(self, i):
+        item = self.items[i]
+        snippet = (item.get("content") or "")[:CONTEXT_SNIPPET_CHARS]
+        also = "".join(f" | Also reported by: {a.get('source')} ({a.get('link')})" for a in item.get("also", []))
+        return (f"[{i + 1}] Source: {item.get('source')} | Title: {item.get('title')} | "
+                f"Content Snippet: {snippet} | Link: {item.get('link')}{also}\n")
+
+    def context(self, query=None, k=CONTEXT_TOP_K, token_budget=CONTEXT_TOKEN_BUDGET):
+        """Prompt suffix with the selected news, or "" when there is no news."""
+        if not self.items:
+            return ""
+        chosen = self.select(query, k, token_budget)
+        self.used.update(chosen)
+        return CONTEXT_HEADER + "".join(self.line(i) for i in chosen)
@@ -0,0 +1,185 @@
+"""Single-pass sanitizing and word counting for generated post HTML.
+
+Each section is tokenized once: tables, model-written TOC blocks (<div class="mbtTOC">,
+<script>mbtTOC...</script>) and <!--- ... ---> comments are dropped while the words of the
+surviving text are counted. PostBuilder keeps the running total as sections are appended,
+so the assembled post never has to be re-scanned. truncate_html cuts an over-long post back
+at a section or block boundary in one walk.
+"""
+import re
+import threading
+
+# A comment or a start/end tag; group 1 = "/" for end tags, group 2 = tag name, group 3 = attributes.
+_TOKEN = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][^\s/>]*)([^>]*)>", re.DOTALL)
+_SCRIPT_END = re.compile(r"</script\s*>", re.IGNORECASE)
+_TOC_DIV = re.compile(r"""class\s*=\s*["']?mbtTOC""", re.IGNORECASE)
+_WORD = re.compile(r"\S+")
+_VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Block ends truncate_html may cut after. Headings are left out: a cut right after one leaves an empty section.
+_BLOCKS = {"p", "ul", "ol", "li", "blockquote", "div", "figure", "pre"}
+SECTION_MARK = "<!-- Section:"
+TOC_MARK = "<!--- TABLE OF CONTENT START"
+
+
+def clean_section(html):
+    """(sanitized html, word count) for one generated section, in a single left-to-right pass.
+
+    Words are counted like the old `len(re.sub(r"<[^>]+>", " ", html).split())`: tags and
+    comments separate words and are not words themselves. A dropped block that is never
+    closed is kept, as the old regex passes did.
+    """
+    html = html or ""
+    out, words = [], 0
+    skip, skip_tag, depth = None, None, 0  # while dropping a block: (out length, words) at its start
+    pos = 0
+    while True:
+        m = _TOKEN.search(html, pos)
+        text = html[pos:m.start()] if m else html[pos:]
+        if text:
+            out.append(text)
+            words += len(text.split())
+        if not m:
+            break
+        token, closing, name = m.group(0), m.group(1), (m.group(2) or "").lower()
+        pos = m.end()
+
+        if skip is not None:
+            out.append(token)
+            if name == skip_tag:
+                depth += -1 if closing else 1
+                if depth == 0:
+                    del out[skip[0]:]
+                    words = skip[1]
+                    skip = None
+            continue
+
+        if token.startswith("<!---"):
+            continue
+        if not closing and name == "script":
+            end = _SCRIPT_END.search(html, pos)
+            body_end = end.start() if end else len(html)
+            if end and html.startswith("mbtTOC", pos):
+                pos = end.end()
+                continue
+            out.append(token)
+            out.append(html[pos:body_end])  # script bodies are not tokenized (they may contain "<")
+            words += len(html[pos:body_end].split())
+            pos = body_end
+            continue
+        if not closing and (name == "table" or (name == "div" and _TOC_DIV.search(m.group(3)))):
+            skip, skip_tag, depth = (len(out), words), name, 1
+            out.append(token)
+            continue
+        out.append(token)
+    return "".join(out), words
+
+
+def word_count(html):
+    """Words in `html` (tags and comments excluded)."""
+    words, pos = 0, 0
+    html = html or ""
+    for m in _TOKEN.finditer(html):
+        words += len(html[pos:m.start()].split())
+        pos = m.end()
+    return words + len(html[pos:].split())
+
+
+class PostBuilder:
+    """Assembles a post from HTML parts while keeping a running word count."""
+
+    def __init__(self):
+        self._parts = []
+        self.words = 0
+
+    def add(self, html, clean=True, words=None):
+        """Append a part; generated section HTML is sanitized first. Returns its word count.
+
+        Pass `words` for HTML that was already cleaned (see clean_section) to skip the scan.
+        """
+        if words is not None:
+            n = words
+        elif clean:
+            html, n = clean_section(html)
+        else:
+            n = word_count(html)
+        self._parts.append(html)
+        self.words += n
+        return n
+
+    def html(self):
+        return "".join(self._parts)
+
+
+class SectionBudget:
+    """Word counts of finished outline positions, shared by concurrent section workers."""
+
+    def __init__(self, max_words):
+        self.max_words = max_words
+        self._words = {}
+        self._lock = threading.Lock()
+
+    def record(self, position, words):
+        with self._lock:
+            self._words[position] = words
+
+    def exhausted(self, position):
+        """True once positions already finished before `position` fill the budget, i.e. anything
+        generated for it would be cut by truncate_html anyway."""
+        with self._lock:
+            return sum(w for p, w in self._words.items() if p < position) >= self.max_words
+
+
+def truncate_html(html, max_words, section_fill=0.9):
+    """Cut `html` to at most `max_words` words without flattening it. Returns (html, words).
+
+    The cut goes before the last <!-- Section: ... --> marker that fits, unless that keeps
+    less than `section_fill` of the budget; then it goes after the last whole block (</p>,
+    </ul>, </li>...; never right after a heading). Tags left open at the cut are closed and the TOC footer is kept. The
+    walk stops at the first word over budget, so it never reads past the cut.
+    """
+    html = html or ""
+    split = html.rfind(TOC_MARK)
+    body, footer = (html[:split], html[split:]) if split >= 0 else (html, "")
+    footer_words = word_count(footer)
+    budget = max(0, max_words - footer_words)
+
+    stack, words, pos = [], 0, 0
+    section_cut = block_cut = None  # (position, words before it, open tags there)
+    while True:
+        m = _TOKEN.search(body, pos)
+        text = body[pos:m.start()] if m else body[pos:]
+        n = len(text.split())
+        if words + n > budget:
+            break
+        words += n
+        if not m:
+            return html, words + footer_words
+        token, closing, name = m.group(0), m.group(1), (m.group(2) or "").lower()
+        if token.startswith(SECTION_MARK):
+            section_cut = (m.start(), words, tuple(stack))
+        elif name and name not in _VOID and not token.endswith("/>"):
+            if not closing:
+                stack.append(name)
+            elif name in stack:
+                while stack.pop() != name:  # also closes anything left open inside it
+                    pass
+                if name in _BLOCKS:
+                    block_cut = (m.end(), words, tuple(stack))
+        pos = m.end()
+
+    if section_cut and section_cut[1] >= section_fill * budget:
+        cut = section_cut
+    elif section_cut or block_cut:
+        cut = max((c for c in (section_cut, block_cut) if c), key=lambda c: c[1])
+    else:
+        # Not even one block fits: cut inside this text run after the last word that does.
+        keep = budget - words
+        end = pos
+        for i, w in enumerate(_WORD.finditer(text)):
+            if i == keep:
+                break
+            end = pos + w.end()
+        cut = (end, budget, tuple(stack))
+    cut_at, words, open_tags = cut
+    closing_tags = "".join(f"</{t}>" for t in reversed(open_tags))
+    return body[:cut_at].rstrip() + closing_tags + ("\n\n" + footer if footer else ""), words + footer_words
@@ -0,0 +1,203 @@
+"""Per-run checkpoint journal so an interrupted post generation resumes instead of starting over.
+
+A run is kept in RUNS_DIR as <run_id>.json (topic, status, owning job), <run_id>.news.json
+(the news context, written when it is set) and <run_id>.steps.jsonl (one line appended per
+completed step), so a checkpoint only writes its own result.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from config import RUNS_DIR, RUN_RESUME_HOURS
+
+NEWS_SUFFIX = ".news.json"
+STEPS_SUFFIX = ".steps.jsonl"
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class RunJournal:
+    """One run: topic, news context, status and the result of every completed step.
+
+    News and steps are read from disk on first use, so scanning journals only reads headers.
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self._data = data
+        self._news = None
+        self._steps = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, topic, news_items=None, job_id=None):
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        data = {
+            "run_id": run_id,
+            "created": time.time(),
+            "topic": topic,
+            "status": "generating",
+            "job_id": job_id,
+        }
+        journal = cls(os.path.join(RUNS_DIR, f"{run_id}.json"), data)
+        journal._steps = {}
+        journal._save()
+        journal.set_news(news_items or [])
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        journal = cls(path, data)
+        if "news" in data or "steps" in data:
+            journal._split(data.pop("news", []), data.pop("steps", {}))
+        return journal
+
+    def _split(self, news, steps):
+        """Move the news and steps of a single-file journal (older format) into their own files."""
+        self.set_news(news)
+        self._steps = {}
+        for step, value in steps.items():
+            self.record(step, value)
+        self._save()
+
+    @classmethod
+    def open(cls, run_id):
+        return cls.load(os.path.join(RUNS_DIR, f"{run_id}.json"))
+
+    def _file(self, suffix):
+        return self.path[:-len(".json")] + suffix
+
+    def _loaded_steps(self):
+        """Steps replayed from the append-only log (caller holds the lock); last record wins."""
+        if self._steps is None:
+            self._steps = {}
+            try:
+                with open(self._file(STEPS_SUFFIX), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            continue  # a line cut short by a crash
+                        self._steps[rec["step"]] = rec["value"]
+            except OSError:
+                pass
+        return self._steps
+
+    @property
+    def run_id(self):
+        return self._data["run_id"]
+
+    @property
+    def topic(self):
+        return self._data["topic"]
+
+    @property
+    def news(self):
+        with self._lock:
+            if self._news is None:
+                try:
+                    with open(self._file(NEWS_SUFFIX), "r", encoding="utf-8") as f:
+                        self._news = json.load(f)
+                except (OSError, ValueError):
+                    self._news = []
+            return self._news
+
+    @property
+    def job_id(self):
+        """Batch job that owns this run (None for direct/scheduler runs)."""
+        return self._data.get("job_id")
+
+    @property
+    def resumed(self):
+        with self._lock:
+            return bool(self._loaded_steps())
+
+    @property
+    def created(self):
+        return self._data.get("created", 0)
+
+    @property
+    def status(self):
+        return self._data.get("status")
+
+    def get(self, step):
+        with self._lock:
+            return self._loaded_steps().get(step)
+
+    def set_news(self, news_items):
+        with self._lock:
+            self._news = news_items
+            _write_json(self._file(NEWS_SUFFIX), news_items)
+
+    def record(self, step, value):
+        with self._lock:
+            self._loaded_steps()[step] = value
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self._file(STEPS_SUFFIX), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"step": step, "value": value}, ensure_ascii=False) + "\n")
+
+    def finish(self, status="posted"):
+        with self._lock:
+            self._data["status"] = status
+            self._save()
+
+    def delete(self):
+        """Remove the run's files (a finished run has nothing left to resume)."""
+        for path in (self.path, self._file(NEWS_SUFFIX), self._file(STEPS_SUFFIX)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _save(self):
+        _write_json(self.path, self._data)
+
+
+def pending_run():
+    """Most recent unfinished direct/scheduler run younger than RUN_RESUME_HOURS, or None.
+
+    Journals of finished runs, and of runs too old to resume, are deleted along the way. Batch
+    runs are left alone: their job queue resumes them and deletes them when the job ends.
+    """
+    if not os.path.isdir(RUNS_DIR):
+        return None
+    cutoff = time.time() - RUN_RESUME_HOURS * 3600
+    found = None
+    for name in sorted(os.listdir(RUNS_DIR), reverse=True):
+        if not name.endswith(".json") or name.endswith(NEWS_SUFFIX):
+            continue
+        try:
+            journal = RunJournal.load(os.path.join(RUNS_DIR, name))
+        except (OSError, ValueError):
+            continue
+        if journal.job_id is not None:
+            continue
+        if journal.created < cutoff or journal.status in ("posted", "skipped", "abandoned"):
+            journal.delete()
+        elif found is None:
+            found = journal
+    return found
+
+
+def checkpoint(journal, step, produce):
+    """Return the journaled result of `step`, or run `produce()` and journal a non-None result."""
+    if journal:
+        done = journal.get(step)
+        if done is not None:
+            print(f"[+] Resumed '{step}' from run {journal.run_id}")
+            return done
+    value = produce()
+    if journal and value is not None:
+        journal.record(step, value)
+    return value
@@ -1,56 +1,47 @@
 import os
 import json
-import re
-import pickle
 import random
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 
 from config import (
-    CREDENTIALS_FILE, TOKEN_FILE, BLOGGER_BLOG_ID,
+    CREDENTIALS_FILE, BLOGGER_BLOG_ID,
     OPENAI_API_KEY, GEMINI_API_KEY, TOPIC, TOPICS,
     BLOG_POST_MIN_WORDS, BLOG_POST_MAX_WORDS, POST_TITLE_MAX_CHARS, FORCE_POST, OUTLINE_SECTIONS,
     SECTION_WORDS, LOG_VERBOSE, MSG_START, MSG_PHASE1, MSG_OUTLINE_READY, MSG_PHASE2_HEADER,
-    MSG_PHASE2_SECTION, MSG_COMPLETE, FIRST_SECTION_NAME
+    MSG_PHASE2_SECTION, MSG_COMPLETE, FIRST_SECTION_NAME, SECTION_CONCURRENCY,
+    CONTEXT_OUTLINE_K, CONTEXT_OUTLINE_TOKEN_BUDGET, NEWS_MIN_ITEMS, NEWS_MIN_WAIT,
+    AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN, AI_HEDGE, AI_HEDGE_MIN_DELAY
 )
-from models.remote_agent import fetch_openai, fetch_gemini
+from metrics import METRICS
+from models.custom_agent.bot import mark_used
+from models.remote_agent import (
+    fetch_openai, fetch_gemini, parse_stats, stream_stats, ProviderRouter, cached_response, cache_response,
+)
+from .context import NewsIndex
+from .html_post import PostBuilder, SectionBudget, clean_section, truncate_html, word_count
+from .journal import RunJournal, checkpoint
+from .publisher import get_publisher
 
 load_dotenv()
 
-SCOPES = ['https://www.googleapis.com/auth/blogger']
+# Failover order OpenAI -> Gemini, with circuit breakers (and optional hedging) per provider.
+ROUTER = ProviderRouter(
+    [(name, fn) for name, fn, key in (("openai", fetch_openai, OPENAI_API_KEY), ("gemini", fetch_gemini, GEMINI_API_KEY)) if key],
+    failures=AI_BREAKER_FAILURES, cooldown=AI_BREAKER_COOLDOWN, hedge=AI_HEDGE, hedge_min_delay=AI_HEDGE_MIN_DELAY,
+)
 
-def get_credentials():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, 'rb') as token:
-            creds = pickle.load(token)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                CREDENTIALS_FILE, SCOPES, redirect_uri='http://127.0.0.1:8081/'
-            )
-            creds = flow.run_local_server(port=8081, host='127.0.0.1')
-        with open(TOKEN_FILE, 'wb') as token:
-            pickle.dump(creds, token)
-    return creds
-
-def _word_count(html):
-    return len(re.sub(r"<[^>]+>", " ", html or "").split())
-
-def _fetch_ai(query):
-    if OPENAI_API_KEY:
-        r = fetch_openai(query)
-        if r:
-            return r
-    if GEMINI_API_KEY:
-        r = fetch_gemini(query)
-        if r:
-            return r
+def _fetch_ai(query, salt=None):
+    # Checked before the router so cache hits don't show up as near-zero provider calls.
+    r = cached_response(query, salt)
+    if r:
+        return r
+    r = ROUTER.call(query)
+    if r:
+        cache_response(query, r, salt)
+        r.pop('salvaged', None)
+        return r
     print(f"[!] All APIs failed for query '{query[:50]}...'")
     return None
 
@@ -58,15 +49,76 @@ def _log(msg, **kw):
     if LOG_VERBOSE:
         print(msg.format(**kw) if kw else msg)
 
-def generate_ai_content(topic=None, context_news=None):
+def _section_query(section, topic, context_str):
+    return (
+        f"[MODE: SECTION_ONLY] Write an extremely detailed, {SECTION_WORDS}-word deep-dive content for the section \"{section}\" as part of a larger, authoritative post about \"{topic}\". "
+        f"MANDATORY: Use ONLY 2026 news. Mention DATE, DAY, and TIME for events. "
+        f"Categorize into: Education & Learning, Scholarships & Study Abroad, International (Overseas) News, Latest Tech News, Unique & Innovative Gadget Reviews. "
+        f"Use real links and sources. Use <p style=\"text-align: justify;\">.{context_str}"
+    )
+
+def _cache_salt(journal):
+    """Batch jobs send the same prompts for a topic; keying the AI cache by run keeps their posts distinct."""
+    return journal.run_id if journal and journal.job_id is not None else None
+
+def _generate_header(topic, context_str, salt=None):
+    _log(MSG_PHASE2_HEADER)
+    header_data = _fetch_ai(_section_query(FIRST_SECTION_NAME, topic, context_str), salt)
+    if not header_data:
+        _log("[!] Header generation failed. Retrying with simpler query...")
+        header_data = _fetch_ai(f"generate {topic}", salt)
+    return header_data
+
+def _generate_section(section, i, total, topic, context_str, salt=None):
+    """Raw HTML for one outline section (sanitized when the post is assembled), or None if generation failed."""
+    _log(MSG_PHASE2_SECTION, i=i, total=total, section=section)
+    sec_data = _fetch_ai(_section_query(section, topic, context_str), salt)
+    if not (sec_data and 'content' in sec_data):
+        return None
+    return sec_data['content']
+
+def _header_task(journal, topic, context_str, budget):
+    with METRICS.timer("header"):
+        header_data = checkpoint(journal, "header", lambda: _generate_header(topic, context_str, _cache_salt(journal)))
+    if header_data:
+        budget.record(1, word_count(header_data.get('content', '')))
+    return header_data
+
+def _section_task(journal, section, i, total, topic, context_str, budget):
+    """(clean html, words) for section i, ("", 0) if the post is already full, None on failure."""
+    if budget.exhausted(i):
+        _log(f"[~] Skipping section '{section}': earlier sections already reach {budget.max_words} words")
+        METRICS.inc("section_skipped")
+        return "", 0
+    with METRICS.timer("section", section=i):
+        content = checkpoint(journal, f"section:{i}", functools.partial(
+            _generate_section, section, i, total, topic, context_str, _cache_salt(journal)))
+    if content is None:
+        METRICS.inc("section_failed")
+        return None
+    html, words = clean_section(content)
+    budget.record(i, words)
+    return html, words
+
+def generate_ai_content(topic=None, context_news=None, journal=None):
+    """Outline -> header + sections -> assembled post. With a RunJournal, every completed
+    step is checkpointed and reused if this run is resumed.
+
+    `context_news` may be a NewsStream that is still collecting: the outline then uses the
+    first NEWS_MIN_ITEMS items and the header and sections the complete set.
+    """
     selected_topic = topic or random.choice(TOPICS)
+    salt = _cache_salt(journal)
+    stream = context_news if hasattr(context_news, "wait") else None
+    if stream:
+        context_news = stream.wait(NEWS_MIN_ITEMS, NEWS_MIN_WAIT)
+        _log(f"[+] Outlining with the first {len(context_news)} news items")
+        if journal:
+            journal.set_news(context_news)
     
-    # Build context string if news items are provided
-    context_str = ""
-    if context_news:
-        context_str = "\n\nUSE THE FOLLOWING REAL-TIME NEWS AS YOUR PRIMARY SOURCE AND EVIDENCE:\n"
-        for idx, item in enumerate(context_news[:5], 1): # Use top 5 news items
-            context_str += f"[{idx}] Source: {item.get('source')} | Title: {item.get('title')} | Content Snippet: {item.get('content')[:500]} | Link: {item.get('link')}\n"
+    # Each prompt only carries the news items most relevant to it (see app/context.py).
+    news_index = NewsIndex(context_news)
+    context_str = news_index.context(selected_topic, k=CONTEXT_OUTLINE_K, token_budget=CONTEXT_OUTLINE_TOKEN_BUDGET)
     
     _log(MSG_START, topic=selected_topic)
     _log(MSG_PHASE1, n=OUTLINE_SECTIONS)
@@ -77,113 +129,203 @@ def generate_ai_content(topic=None, context_news=None):
         f"ASSIGN each news item to exactly one of these categories: Education & Learning, Scholarships & Study Abroad, International (Overseas) News, Latest Tech News, Unique & Innovative Gadget Reviews. "
         f"Return JSON with \"topic\" and \"sections\" array of exactly {OUTLINE_SECTIONS} section titles. No more, no less.{context_str}"
     )
-    outline_data = _fetch_ai(outline_query)
+    with METRICS.timer("outline"):
+        outline_data = checkpoint(journal, "outline", lambda: _fetch_ai(outline_query, salt))
+    used = set(news_index.used)
+    if stream:
+        # Items keep their positions as the stream grows, so citation numbers stay valid.
+        context_news = stream.result()
+        news_index = NewsIndex(context_news)
+        if journal:
+            journal.set_news(context_news)
     if not outline_data or 'sections' not in outline_data:
         _log("[!] Failed to get outline. Using fallback single-shot generation.")
-        return _fetch_ai(f"generate {selected_topic}") or {'title': selected_topic, 'content': '<p>Content generation failed.</p>', 'labels': ['error']}
+        METRICS.inc("single_shot_fallback", step="outline")
+        return checkpoint(journal, "final", lambda: _fetch_ai(f"generate {selected_topic}", salt)) or {'title': selected_topic, 'content': '<p>Content generation failed.</p>', 'labels': ['error']}
+    final = journal.get("final") if journal else None
+    if final:
+        print(f"[+] Resumed assembled post from run {journal.run_id}")
+        return final
     sections = outline_data['sections'][:OUTLINE_SECTIONS]
     _log(MSG_OUTLINE_READY, n=len(sections))
-    full_html = ""
-    _log(MSG_PHASE2_HEADER)
-    header_query = (
-        f"[MODE: SECTION_ONLY] Write an extremely detailed, {SECTION_WORDS}-word deep-dive content for the section \"{FIRST_SECTION_NAME}\" as part of a larger, authoritative post about \"{selected_topic}\". "
-        f"MANDATORY: Use ONLY 2026 news. Mention DATE, DAY, and TIME for events. "
-        f"Categorize into: Education & Learning, Scholarships & Study Abroad, International (Overseas) News, Latest Tech News, Unique & Innovative Gadget Reviews. "
-        f"Use real links and sources. Use <p style=\"text-align: justify;\">.{context_str}"
-    )
-    header_data = _fetch_ai(header_query)
-    if not header_data:
-        _log("[!] Header generation failed. Retrying with simpler query...")
-        header_data = _fetch_ai(f"generate {selected_topic}")
-    
+    post = PostBuilder()
+    # Sections that start after earlier ones already fill BLOG_POST_MAX_WORDS are not generated.
+    budget = SectionBudget(BLOG_POST_MAX_WORDS)
+
+    # Header and sections are independent prompts: generate them concurrently, assemble in outline order.
+    with ThreadPoolExecutor(max_workers=max(1, SECTION_CONCURRENCY), thread_name_prefix="section") as pool:
+        header_context = news_index.context(f"{FIRST_SECTION_NAME} {selected_topic}")
+        header_future = pool.submit(METRICS.bind(_header_task), journal, selected_topic, header_context, budget)
+        section_futures = [
+            pool.submit(METRICS.bind(_section_task), journal, section, i, len(sections), selected_topic,
+                        news_index.context(f"{section} {selected_topic}"), budget)
+            for i, section in enumerate(sections[1:], 2)
+        ]
+        header_data = header_future.result()
+        section_parts = []
+        for section, fut in zip(sections[1:], section_futures):
+            try:
+                section_parts.append(fut.result())
+            except Exception as e:
+                print(f"[!] Section '{section}' raised: {e}")
+                section_parts.append(None)
+    if journal:
+        # Positions in the journaled news; marked seen only once the post is published.
+        journal.record("news_used", sorted(used | news_index.used))
+
     if header_data:
-        full_html += header_data.get('content', '')
+        post.add(header_data.get('content', ''), clean=False)
         final_labels = header_data.get('labels', [])
         final_title = header_data.get('title', f"The Ultimate Guide to {selected_topic}")
     else:
         final_labels = ["education", selected_topic.lower()]
         final_title = f"The Definitive Guide to {selected_topic}"
-        full_html += f"<h1>{final_title}</h1><p>Comprehensive guide about {selected_topic}.</p>"
-
-    for i, section in enumerate(sections[1:], 2):
-        _log(MSG_PHASE2_SECTION, i=i, total=len(sections), section=section)
-        sec_query = (
-            f"[MODE: SECTION_ONLY] Write an extremely detailed, {SECTION_WORDS}-word deep-dive content for the section \"{section}\" as part of a larger, authoritative post about \"{selected_topic}\". "
-            f"MANDATORY: Use ONLY 2026 news. Mention DATE, DAY, and TIME for events. "
-            f"Categorize into: Education & Learning, Scholarships & Study Abroad, International (Overseas) News, Latest Tech News, Unique & Innovative Gadget Reviews. "
-            f"Use real links and sources. Use <p style=\"text-align: justify;\">.{context_str}"
-        )
-        sec_data = _fetch_ai(sec_query)
-
-        if sec_data and 'content' in sec_data:
-            content = sec_data['content']
-            content = re.sub(r'<table.*?</table>', '', content, flags=re.DOTALL | re.IGNORECASE)
-            content = re.sub(r'<div class="mbtTOC".*?</div>', '', content, flags=re.DOTALL | re.IGNORECASE)
-            content = re.sub(r'<script>mbtTOC.*?</script>', '', content, flags=re.DOTALL | re.IGNORECASE)
-            content = re.sub(r'<!---.*?--->', '', content, flags=re.DOTALL | re.IGNORECASE)
-            full_html += f"\n\n<!-- Section: {section} -->\n" + content
-        else:
+        post.add(f"<h1>{final_title}</h1><p>Comprehensive guide about {selected_topic}.</p>", clean=False)
+
+    for section, part in zip(sections[1:], section_parts):
+        if part is None:
             print(f"[!] Warning: Failed to generate section '{section}'")
+            continue
+        html, words = part
+        if not html:
+            continue
+        post.add(f"\n\n<!-- Section: {section} -->\n", clean=False)
+        post.add(html, words=words)
 
-    if _word_count(full_html) < 100:
+    if post.words < 100:
          _log("[!] Content still too short. Attempting final single-shot recovery...")
-         recovery_data = _fetch_ai(f"generate detailed blog post about {selected_topic}")
+         METRICS.inc("single_shot_fallback", step="recovery")
+         recovery_data = _fetch_ai(f"generate detailed blog post about {selected_topic}", salt)
          if recovery_data and 'content' in recovery_data:
-             full_html += "\n\n" + recovery_data['content']
+             post.add("\n\n" + recovery_data['content'], clean=False)
 
-    full_html += "\n\n<!--- TABLE OF CONTENT START 2215587-->\n<script>mbtTOC();</script>\n<!--- TABLE OF CONTENT END 2215587-->"
-    wc = _word_count(full_html)
-    _log(MSG_COMPLETE, wc=wc, min=BLOG_POST_MIN_WORDS, max=BLOG_POST_MAX_WORDS)
-    return {'title': final_title, 'content': full_html, 'labels': final_labels}
+    post.add("\n\n<!--- TABLE OF CONTENT START 2215587-->\n<script>mbtTOC();</script>\n<!--- TABLE OF CONTENT END 2215587-->", clean=False)
+    _log(MSG_COMPLETE, wc=post.words, min=BLOG_POST_MIN_WORDS, max=BLOG_POST_MAX_WORDS)
+    result = {'title': final_title, 'content': post.html(), 'labels': final_labels, 'words': post.words}
+    if journal:
+        journal.record("final", result)
+    return result
 
-def _truncate_to_words(html, max_words):
-    if _word_count(html) <= max_words:
-        return html
-    words = re.sub(r"<[^>]+>", " ", html).split()[:max_words]
-    return "<p>" + " ".join(words) + "</p>"
+def mark_news_used(journal):
+    """After publishing: stories that reached this run's prompts are skipped by later scans."""
+    news = journal.news
+    mark_used([news[i] for i in journal.get("news_used") or () if i < len(news)])
 
-def post_to_blogger(title, content, labels=None):
-    if not BLOGGER_BLOG_ID:
+def _can_post(blog_id):
+    if not blog_id:
         print("[!] BLOGGER_BLOG_ID not set. Skipping post.")
-        return None
+        return False
     if not os.path.exists(CREDENTIALS_FILE):
         print(f"[!] {CREDENTIALS_FILE} not found. Skipping post.")
-        return None
-    creds = get_credentials()
-    service = build('blogger', 'v3', credentials=creds)
-    post = {'kind': 'blogger#post', 'blog': {'id': BLOGGER_BLOG_ID}, 'title': title, 'content': content}
+        return False
+    return True
+
+def _post_body(title, content, labels, blog_id):
+    post = {'kind': 'blogger#post', 'blog': {'id': blog_id}, 'title': title, 'content': content}
     if labels:
         post['labels'] = list(labels)[:20]
-    result = service.posts().insert(blogId=BLOGGER_BLOG_ID, body=post).execute()
+    return post
+
+def post_to_blogger(title, content, labels=None, blog_id=None):
+    blog_id = blog_id or BLOGGER_BLOG_ID
+    if not _can_post(blog_id):
+        return None
+    with METRICS.timer("publish"):
+        result = get_publisher().insert(blog_id, _post_body(title, content, labels, blog_id))
+    METRICS.inc("posts_published")
     print(f"Posted: {result.get('url')}")
     return result
 
-def auto_post(news_items=None):
+def post_many_to_blogger(posts):
+    """Publish several posts ({'title', 'content', 'labels', 'blog_id'}) in one batch request.
+
+    Returns one entry per post: the Blogger result, or None if that insert failed.
+    """
+    posts = [dict(p, blog_id=p.get('blog_id') or BLOGGER_BLOG_ID) for p in posts]
+    if not posts or not all(_can_post(p['blog_id']) for p in posts):
+        return [None] * len(posts)
+    ops = [('insert', p['blog_id'], _post_body(p['title'], p['content'], p.get('labels'), p['blog_id'])) for p in posts]
+    out = []
+    with METRICS.timer("publish_batch"):
+        results = get_publisher().submit(ops)
+    for p, (result, error) in zip(posts, results):
+        if error is not None:
+            print(f"[!] Batch insert of '{p['title'][:60]}' failed: {error}")
+            METRICS.inc("posts_failed")
+            result = None
+        else:
+            print(f"Posted: {result.get('url')}")
+            METRICS.inc("posts_published")
+        out.append(result)
+    return out
+
+def _pick_topic():
     topic = (TOPIC and TOPIC.strip()) or None
     if topic and topic not in TOPICS:
         topic = random.choice(TOPICS)
     elif not topic:
         topic = random.choice(TOPICS)
-    print(f"[+] Generating blog post about: {topic}")
-    data = generate_ai_content(topic, context_news=news_items)
+    return topic
+
+def prepare_post(news_items=None, journal=None, topic=None):
+    """Generate (or resume) a post without publishing it.
+
+    Returns (journal, post) where post is {'title', 'content', 'labels'} ready for Blogger,
+    or None when the post was skipped for being too short.
+    """
+    if journal and journal.resumed:
+        topic, news_items = journal.topic, journal.news
+        print(f"[+] Resuming run {journal.run_id} about: {topic}")
+    else:
+        stream = news_items if hasattr(news_items, "wait") else None  # NewsStream: journaled once items arrive
+        if not journal:
+            journal = RunJournal.create(topic or _pick_topic(), None if stream else news_items)
+        topic, news_items = journal.topic, stream or journal.news
+        print(f"[+] Generating blog post about: {topic} (run {journal.run_id})")
+    with METRICS.timer("generate"):
+        data = generate_ai_content(topic, context_news=news_items, journal=journal)
     if isinstance(data, dict):
         title = (data.get('title') or 'Untitled')[:POST_TITLE_MAX_CHARS]
         content = data.get('content') or ''
         labels = data.get('labels') or []
+        wc = data.get('words')
     else:
         lines = (data or '').split('\n')
         title = (lines[0].replace('#', '').strip() if lines else 'Untitled')[:POST_TITLE_MAX_CHARS]
         content = '\n'.join(lines[1:]) if len(lines) > 1 else (data or '')
         labels = []
-    wc = _word_count(content)
+        wc = None
+    if wc is None:
+        wc = word_count(content)
     if not FORCE_POST and wc < BLOG_POST_MIN_WORDS:
         print(f"[!] Skipping post: {wc} words < min {BLOG_POST_MIN_WORDS} (set FORCE_POST=true to post anyway)")
-        return
+        journal.finish("skipped")
+        return journal, None
     if wc > BLOG_POST_MAX_WORDS:
-        content = _truncate_to_words(content, BLOG_POST_MAX_WORDS)
-        print(f"[+] Truncated to {BLOG_POST_MAX_WORDS} words")
+        content, wc = truncate_html(content, BLOG_POST_MAX_WORDS)
+        print(f"[+] Truncated to {wc} words (max {BLOG_POST_MAX_WORDS})")
     print(f"[+] Generated title: {title}")
-    post_to_blogger(title, content, labels)
+    for name, st in ROUTER.snapshot().items():
+        p50 = f"{st['p50']:.1f}s" if st['p50'] is not None else "n/a"
+        print(f"[+] {name}: {st['calls']} calls, {st['error_rate']:.0%} errors, p50 {p50}, circuit {st['state']}, {st['hedges']} hedged")
+    for name, st in stream_stats().items():
+        ttft = f"{st['ttft_p50']:.1f}s" if st['ttft_p50'] is not None else "n/a"
+        rate = f"{st['tokens_per_sec_p50']:.0f} tok/s" if st['tokens_per_sec_p50'] is not None else "n/a"
+        print(f"[+] {name}: {st['calls']} streamed, TTFT p50 {ttft}, {rate}, {st['aborted']} aborted")
+    for name, st in parse_stats().items():
+        print(f"[+] {name}: {st['responses']} replies parsed, {st['failure_rate']:.0%} unusable, {st['repaired']} repaired")
+    return journal, {'title': title, 'content': content, 'labels': labels}
+
+def auto_post(news_items=None, journal=None, topic=None, blog_id=None):
+    """Generate and publish one post. Pass a RunJournal (see journal.pending_run) to resume it."""
+    journal, post = prepare_post(news_items, journal, topic)
+    if post is None:
+        return None
+    result = post_to_blogger(post['title'], post['content'], post['labels'], blog_id=blog_id)
+    if result:
+        journal.finish("posted")
+        mark_news_used(journal)
+    return result
 
 if __name__ == '__main__':
     auto_post()
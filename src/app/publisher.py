@@ -0,0 +1,117 @@
+"""Long-lived Blogger client: credentials kept in memory, one built service, batched writes."""
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta, timezone
+
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+
+from config import CREDENTIALS_FILE, TOKEN_FILE, TOKEN_REFRESH_MARGIN, BLOGGER_API_ENDPOINT
+
+SCOPES = ['https://www.googleapis.com/auth/blogger']
+BATCH_LIMIT = 50  # requests per batch HTTP call
+
+
+def _save_token(creds):
+    with open(TOKEN_FILE, 'wb') as token:
+        pickle.dump(creds, token)
+
+
+def get_credentials():
+    creds = None
+    if os.path.exists(TOKEN_FILE):
+        with open(TOKEN_FILE, 'rb') as token:
+            creds = pickle.load(token)
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                CREDENTIALS_FILE, SCOPES, redirect_uri='http://127.0.0.1:8081/'
+            )
+            creds = flow.run_local_server(port=8081, host='127.0.0.1')
+        _save_token(creds)
+    return creds
+
+
+class BloggerPublisher:
+    """Loads token.json once, refreshes it shortly before expiry, and reuses one Blogger service.
+
+    The service comes from the discovery document bundled with google-api-python-client
+    (static_discovery), so building it costs no network round-trip. Calls are serialized
+    because the underlying httplib2 connection is not thread-safe.
+    """
+
+    def __init__(self, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._creds = None
+        self._service = None
+        self._lock = threading.RLock()
+
+    def _ensure_fresh(self):
+        if self._creds is None:
+            self._creds = get_credentials()
+        expiry = self._creds.expiry  # naive UTC, as google-auth stores it
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self._creds.refresh_token and (not self._creds.valid or (expiry and expiry - now < self.refresh_margin)):
+            self._creds.refresh(Request())
+            _save_token(self._creds)
+
+    @property
+    def service(self):
+        with self._lock:
+            self._ensure_fresh()
+            if self._service is None:
+                options = {'api_endpoint': BLOGGER_API_ENDPOINT} if BLOGGER_API_ENDPOINT else None
+                self._service = build('blogger', 'v3', credentials=self._creds, client_options=options,
+                                      cache_discovery=False, static_discovery=True)
+            return self._service
+
+    def insert(self, blog_id, post):
+        with self._lock:
+            return self.service.posts().insert(blogId=blog_id, body=post).execute()
+
+    def update(self, blog_id, post_id, post):
+        with self._lock:
+            return self.service.posts().update(blogId=blog_id, postId=post_id, body=post).execute()
+
+    def submit(self, ops):
+        """Run several writes through Blogger's batch endpoint.
+
+        ops: list of ("insert", blog_id, body) or ("update", blog_id, body, post_id).
+        Returns [(result, error)] in the same order as ops.
+        """
+        results = [(None, None)] * len(ops)
+        with self._lock:
+            service = self.service
+            for start in range(0, len(ops), BATCH_LIMIT):
+                def done(request_id, response, exception):
+                    results[int(request_id)] = (response, exception)
+
+                batch = service.new_batch_http_request(callback=done)
+                for i, op in enumerate(ops[start:start + BATCH_LIMIT], start):
+                    kind, blog_id, body = op[:3]
+                    if kind == 'insert':
+                        req = service.posts().insert(blogId=blog_id, body=body)
+                    elif kind == 'update':
+                        req = service.posts().update(blogId=blog_id, postId=op[3], body=body)
+                    else:
+                        raise ValueError(f"unknown Blogger op {kind!r}")
+                    batch.add(req, request_id=str(i))
+                batch.execute()
+        return results
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher():
+    """Process-wide BloggerPublisher."""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = BloggerPublisher()
+        return _publisher
@@ -1,16 +1,153 @@
-import schedule
+"""Scheduler: news prefetch, generation and publishing run as independent, non-overlapping jobs.
+
+News is prefetched into the news store every PREFETCH_MINUTES, a post is generated at
+GENERATE_AT from what the store gained since the previous generation, and the ready post is published at PUBLISH_AT. Last-run state is kept in
+SCHEDULER_STATE_FILE so a restart knows whether the warm-up prefetch is due.
+"""
+import json
+import os
+import random
+import threading
 import time
-from .post import auto_post
-from models.custom_agent.bot import run_once
+import traceback
+
+import schedule
+
+from config import (
+    PREFETCH_MINUTES, GENERATE_AT, PUBLISH_AT, SCHEDULE_JITTER_SECONDS, SCHEDULER_STATE_FILE,
+)
+from metrics import METRICS, end_run
+from .journal import pending_run
+from .post import auto_post, prepare_post
+from models.custom_agent.bot import news_store, run_once
+from models.custom_agent.config import MAX_ITEMS
+
+_state_lock = threading.Lock()
+_running = {}  # job name -> Lock held while that job runs
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _load_state():
+    return _read_json(SCHEDULER_STATE_FILE, {})
+
+
+def _save_state(name, **fields):
+    with _state_lock:
+        state = _load_state()
+        state.setdefault(name, {}).update(fields)
+        _write_json(SCHEDULER_STATE_FILE, state)
 
-def _job():
-    news_items = run_once()
-    auto_post(news_items=news_items)
 
-schedule.every().day.at("09:00").do(_job)
+def _spawn(name, fn, jitter=True):
+    """Run fn in its own thread unless the previous run of `name` is still going."""
+    lock = _running.setdefault(name, threading.Lock())
+    if not lock.acquire(blocking=False):
+        print(f"[~] {name}: previous run still in progress, skipping this tick")
+        return
+
+    def runner():
+        METRICS.begin_run()  # this job's report only covers this job, even while others overlap
+        try:
+            if jitter and SCHEDULE_JITTER_SECONDS:
+                time.sleep(random.uniform(0, SCHEDULE_JITTER_SECONDS))
+            _save_state(name, last_start=time.time(), status="running")
+            fn()
+            _save_state(name, last_end=time.time(), status="ok", error=None)
+        except Exception as e:
+            traceback.print_exc()
+            _save_state(name, last_end=time.time(), status="failed", error=str(e)[:500])
+        finally:
+            lock.release()
+            end_run(name)
+
+    threading.Thread(target=runner, name=f"job-{name}", daemon=True).start()
+
+
+def prefetch():
+    """Collect news into the news store, where the next generation picks it up.
+
+    Polls conditionally: unchanged feeds cost a 304 and only entries new since the last scan
+    are considered.
+    """
+    items = run_once(conditional=True)
+    print(f"[+] Prefetch: {len(items)} new items")
+
+
+def _take_warm_news():
+    """The newest MAX_ITEMS stored since the previous generation took its news (the last day
+    on a first run), and mark them taken."""
+    taken = time.time()
+    since = _load_state().get("generate", {}).get("news_since") or taken - 86400
+    items = news_store().latest(MAX_ITEMS, added_since=since)
+    _save_state("generate", news_since=taken)
+    return items
+
+
+def generate():
+    """Generate the next post (not published) from warm news; it waits in its journal as 'ready'."""
+    journal = pending_run()
+    if journal and journal.status == "ready":
+        print(f"[+] Post from run {journal.run_id} is already waiting to be published")
+        return
+    news_items = _take_warm_news() if not journal else None
+    if not journal and not news_items:
+        print("[~] No warm news; collecting now")
+        news_items = run_once()
+        _save_state("generate", news_since=time.time())  # what this run stored is taken too
+    journal, post = prepare_post(news_items=news_items, journal=journal)
+    if post:
+        journal.finish("ready")
+    _save_state("generate", outcome="ready" if post else "skipped", run_id=journal.run_id)
+
+
+def publish():
+    """Publish the prepared post; if generation has not produced one, wait for it or generate now.
+
+    A generation that skipped its post (too short) settles this slot: nothing is generated again.
+    """
+    lock = _running.setdefault("generate", threading.Lock())
+    with lock:  # an in-flight generation finishes first; none can start meanwhile
+        journal = pending_run()
+        state = _load_state()
+        last_generate = state.get("generate", {})
+        skipped = (last_generate.get("outcome") == "skipped"
+                   and (last_generate.get("last_end") or 0) > (state.get("publish", {}).get("last_end") or 0))
+        if (journal is None or journal.status != "ready") and skipped:
+            print(f"[~] Generation skipped its post (run {last_generate.get('run_id')}); nothing to publish")
+            return
+        if journal is None or journal.status != "ready":
+            print("[~] No prepared post at publish time; generating one now")
+            generate()
+            journal = pending_run()
+    if journal is not None:
+        auto_post(journal=journal)
+
 
 def run():
-    print("Scheduler started. News + posts daily at 9:00 AM")
+    schedule.every(PREFETCH_MINUTES).minutes.do(_spawn, "prefetch", prefetch)
+    schedule.every().day.at(GENERATE_AT).do(_spawn, "generate", generate)
+    schedule.every().day.at(PUBLISH_AT).do(_spawn, "publish", publish, jitter=False)
+    print(f"Scheduler started. News prefetch every {PREFETCH_MINUTES} min, "
+          f"generation daily at {GENERATE_AT}, publishing at {PUBLISH_AT}")
+
+    last = _load_state().get("prefetch", {}).get("last_end") or 0
+    if time.time() - last > PREFETCH_MINUTES * 60:
+        _spawn("prefetch", prefetch, jitter=False)  # warm up after a (re)start
     while True:
         schedule.run_pending()
-        time.sleep(60)
+        time.sleep(max(1, min(60, schedule.idle_seconds() or 60)))
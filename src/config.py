@@ -14,11 +14,28 @@ TOKEN_FILE = os.getenv("TOKEN_FILE") or str(CREDENTIALS_DIR / "token.json")
 
 # --- Blogger ---
 BLOGGER_BLOG_ID = os.getenv("BLOGGER_BLOG_ID", "3422137415075355570")
+# Batch mode posts to every blog listed here (comma-separated); defaults to BLOGGER_BLOG_ID.
+BLOG_IDS = [b.strip() for b in os.getenv("BLOGGER_BLOG_IDS", BLOGGER_BLOG_ID).split(",") if b.strip()]
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "300"))  # refresh OAuth token this many seconds before expiry
+BLOGGER_API_ENDPOINT = os.getenv("BLOGGER_API_ENDPOINT", "").strip()  # e.g. a local stand-in; empty = Google
 
 # --- AI APIs (failover: OpenAI → Gemini) ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
 
+# --- Provider routing: circuit breaker + optional hedged requests ---
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "3"))  # consecutive failures that open a circuit
+AI_BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "60"))  # seconds before a trial request
+AI_HEDGE = os.getenv("AI_HEDGE", "false").lower() in ("1", "true", "yes")
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "20"))  # hedge after max(this, primary p95) seconds
+
+# --- Client-side quotas per provider (0 = unlimited) and retry policy for 429/5xx ---
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "0"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "0"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "0"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "0"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+
 # --- Blog post limits ---
 BLOG_POST_MIN_WORDS = int(os.getenv("BLOG_POST_MIN_WORDS", "3000"))
 FORCE_POST = os.getenv("FORCE_POST", "false").lower() in ("1", "true", "yes")  # skip min-word check
@@ -29,9 +46,60 @@ POST_TITLE_MAX_CHARS = int(os.getenv("POST_TITLE_MAX_CHARS", "100"))
 AI_MAX_TOKENS = int(os.getenv("AI_MAX_TOKENS", "4096"))
 OUTLINE_SECTIONS = int(os.getenv("OUTLINE_SECTIONS", "15"))
 SECTION_WORDS = int(os.getenv("SECTION_WORDS", "100"))
+AI_STREAM = os.getenv("AI_STREAM", "true").lower() in ("1", "true", "yes")  # stream completions (TTFT stats, early abort)
+AI_STREAM_OVERRUN = float(os.getenv("AI_STREAM_OVERRUN", "2.0"))  # cut a section off at this x its share of the post (0 = never)
+AI_STRUCTURED = os.getenv("AI_STRUCTURED", "true").lower() in ("1", "true", "yes")  # JSON-schema constrained replies
+SECTION_CONCURRENCY = int(os.getenv("SECTION_CONCURRENCY", "4"))  # parallel section requests (1 = sequential)
+
+# --- News context per prompt (BM25-selected from the collected items) ---
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "3"))  # items per header/section prompt
+CONTEXT_OUTLINE_K = int(os.getenv("CONTEXT_OUTLINE_K", "5"))  # items in the outline prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "500"))  # approx. news tokens per header/section prompt
+CONTEXT_OUTLINE_TOKEN_BUDGET = int(os.getenv("CONTEXT_OUTLINE_TOKEN_BUDGET", "900"))
+CONTEXT_SNIPPET_CHARS = int(os.getenv("CONTEXT_SNIPPET_CHARS", "500"))
+# Direct mode streams news: the outline starts once NEWS_MIN_ITEMS have arrived (or after
+# NEWS_MIN_WAIT seconds); header and sections wait for the full set.
+NEWS_STREAM = os.getenv("NEWS_STREAM", "true").lower() in ("1", "true", "yes")
+NEWS_MIN_ITEMS = int(os.getenv("NEWS_MIN_ITEMS", "5"))
+NEWS_MIN_WAIT = float(os.getenv("NEWS_MIN_WAIT", "60"))
+
+# --- AI response cache (reruns within the TTL reuse identical completions at zero token cost) ---
+AI_CACHE = os.getenv("AI_CACHE", "true").lower() in ("1", "true", "yes")
+AI_CACHE_FILE = os.getenv("AI_CACHE_FILE") or str(BASE_DIR / "data" / "ai_cache.sqlite")
+AI_CACHE_TTL_HOURS = float(os.getenv("AI_CACHE_TTL_HOURS", "24"))
+AI_CACHE_MAX_MB = float(os.getenv("AI_CACHE_MAX_MB", "100"))
+
+# --- Run checkpoints (an interrupted generation resumes from its last completed step) ---
+RUNS_DIR = os.getenv("RUNS_DIR") or str(BASE_DIR / "data" / "runs")
+RUN_RESUME_HOURS = float(os.getenv("RUN_RESUME_HOURS", "24"))  # older unfinished runs are not resumed
+
+# --- Metrics: per-run JSON report in METRICS_DIR + cumulative Prometheus textfile ---
+METRICS = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+METRICS_DIR = os.getenv("METRICS_DIR") or str(BASE_DIR / "data" / "metrics")
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE") or str(BASE_DIR / "data" / "metrics" / "bloggerflow.prom")
+METRICS_KEEP_DAYS = float(os.getenv("METRICS_KEEP_DAYS", "30"))  # older run reports are deleted (0 = keep all)
+# USD per 1M tokens (input, output), for cost estimates only
+AI_PRICES = {
+    "openai": (float(os.getenv("OPENAI_PRICE_IN", "0.15")), float(os.getenv("OPENAI_PRICE_OUT", "0.60"))),
+    "gemini": (float(os.getenv("GEMINI_PRICE_IN", "0.30")), float(os.getenv("GEMINI_PRICE_OUT", "2.50"))),
+}
+
+# --- Run mode: "scheduler" (daily at 9:00) | "direct" (post once now) | "batch" (many posts now) ---
+RUN_MODE = os.getenv("RUN_MODE", "scheduler").lower().strip()  # scheduler | direct | batch
+
+# --- Scheduler: prefetch news on an interval, generate ahead of time, publish at a fixed time ---
+PREFETCH_MINUTES = int(os.getenv("PREFETCH_MINUTES", "60"))
+GENERATE_AT = os.getenv("GENERATE_AT", "08:00")
+PUBLISH_AT = os.getenv("PUBLISH_AT", "09:00")
+SCHEDULE_JITTER_SECONDS = int(os.getenv("SCHEDULE_JITTER_SECONDS", "120"))  # random delay for prefetch/generate
+SCHEDULER_STATE_FILE = os.getenv("SCHEDULER_STATE_FILE") or str(BASE_DIR / "data" / "scheduler_state.json")
 
-# --- Run mode: "scheduler" (daily at 9:00) | "direct" (post once now) ---
-RUN_MODE = os.getenv("RUN_MODE", "scheduler").lower().strip()  # scheduler | direct
+# --- Batch mode (topic x blog jobs on a persistent queue) ---
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))  # posts generated concurrently
+BATCH_POSTS = int(os.getenv("BATCH_POSTS", "0"))  # 0 = one job per topic x blog
+BATCH_QUEUE_FILE = os.getenv("BATCH_QUEUE_FILE") or str(BASE_DIR / "data" / "jobs.sqlite")
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "2"))
+BATCH_PUBLISH_TOGETHER = os.getenv("BATCH_PUBLISH_TOGETHER", "false").lower() in ("1", "true", "yes")  # one Blogger batch request at the end
 
 # --- Generation phase labels (for progress messages) ---
 LOG_VERBOSE = os.getenv("LOG_VERBOSE", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,235 @@
+"""Run metrics: phase timings, token usage, estimated cost, retry/fallback counters.
+
+Recording is a dict update under a lock, so it stays on in production. Everything is kept
+twice: cumulative totals for the process (exported as a Prometheus textfile, counters only go
+up) and the current run (written as a JSON report by end_run(), then cleared).
+
+A run is scoped by begin_run() to the calling thread's context, so overlapping scheduler jobs
+each get their own; work handed to a thread pool joins it when wrapped with bind(). Records
+made outside any begun run go to a process-wide default run.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "bloggerflow"
+
+_current = contextvars.ContextVar("metrics_run", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Store:
+    def __init__(self):
+        self.timings = {}   # key -> [count, total seconds, max seconds]
+        self.counters = {}  # key -> value
+        self.tokens = {}    # provider -> [prompt tokens, completion tokens, calls]
+        self.started = time.time()
+
+    def observe(self, key, seconds):
+        t = self.timings.get(key)
+        if t is None:
+            self.timings[key] = [1, seconds, seconds]
+        else:
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    def inc(self, key, n):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def add_tokens(self, provider, prompt, completion):
+        t = self.tokens.setdefault(provider, [0, 0, 0])
+        t[0] += prompt
+        t[1] += completion
+        t[2] += 1
+
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._total = _Store()
+        self._run = _Store()  # default run: records made outside begin_run()
+
+    def _current_run(self):
+        run = _current.get()
+        return self._run if run is None else run
+
+    def begin_run(self):
+        """Start a run for the calling context; end_run() there reports only what it recorded."""
+        _current.set(_Store())
+
+    @staticmethod
+    def bind(fn):
+        """fn, recording into the caller's run from whichever thread it is later called on."""
+        return functools.partial(contextvars.copy_context().run, fn)
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._total.observe(key, seconds)
+            self._current_run().observe(key, seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block as phase `name` (recorded even if it raises)."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def inc(self, name, n=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._total.inc(key, n)
+            self._current_run().inc(key, n)
+
+    def add_tokens(self, provider, prompt=0, completion=0):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._total.add_tokens(provider, prompt or 0, completion or 0)
+            self._current_run().add_tokens(provider, prompt or 0, completion or 0)
+
+    # --- export ------------------------------------------------------------------
+
+    @staticmethod
+    def _cost(provider, prompt, completion, prices):
+        price_in, price_out = prices.get(provider, (0.0, 0.0))
+        return (prompt * price_in + completion * price_out) / 1e6
+
+    def _report(self, store, prices):
+        def labels(key):
+            return dict(key[1])
+
+        return {
+            "started": store.started,
+            "elapsed_s": round(time.time() - store.started, 3),
+            "timings": [
+                {"name": k[0], **labels(k), "count": c, "total_s": round(s, 3), "max_s": round(m, 3)}
+                for k, (c, s, m) in sorted(store.timings.items())
+            ],
+            "counters": [{"name": k[0], **labels(k), "value": v} for k, v in sorted(store.counters.items())],
+            "providers": {
+                p: {"calls": n, "prompt_tokens": pt, "completion_tokens": ct,
+                    "cost_usd": round(self._cost(p, pt, ct, prices), 6)}
+                for p, (pt, ct, n) in sorted(store.tokens.items())
+            },
+        }
+
+    def snapshot(self, prices=None):
+        """Current run as a report dict."""
+        with self._lock:
+            return self._report(self._current_run(), prices or {})
+
+    def end_run(self, name, report_dir=None, prom_file=None, prices=None, keep_days=0, **extra):
+        """Write the current run's JSON report (and the cumulative Prometheus textfile), then
+        start a new run. Reports older than keep_days (0 = keep all) are deleted.
+        Returns the report path, or None when nothing was written."""
+        if not self.enabled:
+            return None
+        prices = prices or {}
+        with self._lock:
+            report = self._report(self._current_run(), prices)
+            prom = self._prometheus(prices) if prom_file else None
+            if _current.get() is None:
+                self._run = _Store()
+            else:
+                _current.set(_Store())
+        report.update(run=name, **extra)
+        path = None
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(report["started"]))
+            path = os.path.join(report_dir, f"{stamp}-{name}.json")
+            _atomic_write(path, json.dumps(report, indent=2, ensure_ascii=False))
+            if keep_days:
+                _prune(report_dir, time.time() - keep_days * 86400)
+        if prom_file:
+            _atomic_write(prom_file, prom)
+        return path
+
+    def _prometheus(self, prices):
+        """Cumulative totals in the Prometheus text exposition format (caller holds the lock)."""
+        store = self._total
+        out = []
+
+        def series(metric, labels, value):
+            body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            out.append(f"{PREFIX}_{metric}{{{body}}} {value}" if body else f"{PREFIX}_{metric} {value}")
+
+        out.append(f"# TYPE {PREFIX}_phase_seconds summary")
+        for (name, labels), (count, total, _) in sorted(store.timings.items()):
+            series("phase_seconds_sum", (("phase", name),) + labels, round(total, 6))
+            series("phase_seconds_count", (("phase", name),) + labels, count)
+        out.append(f"# TYPE {PREFIX}_phase_seconds_max gauge")
+        for (name, labels), (_, _, longest) in sorted(store.timings.items()):
+            series("phase_seconds_max", (("phase", name),) + labels, round(longest, 6))
+        out.append(f"# TYPE {PREFIX}_events_total counter")
+        for (name, labels), value in sorted(store.counters.items()):
+            series("events_total", (("event", name),) + labels, value)
+        for metric, idx in (("prompt_tokens_total", 0), ("completion_tokens_total", 1), ("ai_calls_total", 2)):
+            out.append(f"# TYPE {PREFIX}_{metric} counter")
+            for provider, t in sorted(store.tokens.items()):
+                series(metric, (("provider", provider),), t[idx])
+        out.append(f"# TYPE {PREFIX}_cost_usd_total counter")
+        for provider, (pt, ct, _) in sorted(store.tokens.items()):
+            series("cost_usd_total", (("provider", provider),), round(self._cost(provider, pt, ct, prices), 6))
+        out.append(f"# TYPE {PREFIX}_process_start_time_seconds gauge")
+        series("process_start_time_seconds", (), round(store.started, 3))
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _prune(report_dir, cutoff):
+    """Delete JSON reports in report_dir last written before `cutoff` (epoch seconds)."""
+    for name in os.listdir(report_dir):
+        path = os.path.join(report_dir, name)
+        try:
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _enabled():
+    try:
+        from config import METRICS as enabled
+        return enabled
+    except ImportError:
+        return True
+
+
+METRICS = Metrics(enabled=_enabled())
+
+
+def end_run(name, **extra):
+    """Export METRICS for a finished run using the paths and prices in config."""
+    from config import METRICS_DIR, METRICS_PROM_FILE, METRICS_KEEP_DAYS, AI_PRICES
+    path = METRICS.end_run(name, METRICS_DIR, METRICS_PROM_FILE, AI_PRICES, keep_days=METRICS_KEEP_DAYS, **extra)
+    if path:
+        print(f"[+] Metrics report: {path}")
+    return path
@@ -1,11 +1,31 @@
 import feedparser
-import json
+import heapq
+import itertools
 import re
 import time
 import requests
+import threading
 import trafilatura
+from collections import Counter, deque
+from concurrent.futures import (
+    ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout,
+)
 from datetime import datetime
-from .config import SOURCES, MAX_ITEMS, INTERVAL_MINUTES, TOPICS, TOPIC_KEYWORDS, OUTPUT_FILE
+from urllib.parse import urlparse
+from metrics import METRICS
+from .config import (
+    SOURCES, MAX_ITEMS, INTERVAL_MINUTES, TOPICS,
+    FETCH_WORKERS, FEED_TIMEOUT, SCAN_TIMEOUT, EXTRACT_WORKERS, EXTRACT_PER_HOST, EXTRACT_OVERSAMPLE,
+    FEED_STATE_FILE, EXTRACT_CACHE, EXTRACT_CACHE_FILE, EXTRACT_CACHE_TTL_HOURS, EXTRACT_CACHE_MAX_MB,
+    DEDUPE_ACROSS_RUNS, SEEN_INDEX_FILE, SEEN_TTL_DAYS,
+    NEWS_STORE_FILE, NEWS_STORE_MAX_ITEMS, NEWS_STORE_DAYS, NEAR_DUP_DEDUPE, NEAR_DUP_THRESHOLD,
+)
+from .extract_cache import ExtractCache
+from .feed_state import FeedState, entry_id
+from .near_dupes import NearDuplicates
+from .news_store import NewsStore
+from .seen_index import SeenIndex
+from .topics import MATCHER
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
 
@@ -14,106 +34,568 @@ def strip_html(s):
     return re.sub(r"<[^>]+>", " ", s or "").strip()
 
 
+_extract_cache = None
+_extract_cache_lock = threading.Lock()
+
+
+def extract_cache():
+    """Process-wide ExtractCache, or None when EXTRACT_CACHE is disabled."""
+    global _extract_cache
+    if not EXTRACT_CACHE:
+        return None
+    with _extract_cache_lock:
+        if _extract_cache is None:
+            _extract_cache = ExtractCache(EXTRACT_CACHE_FILE, EXTRACT_CACHE_TTL_HOURS, EXTRACT_CACHE_MAX_MB)
+        return _extract_cache
+
+
 def fetch_full_content(url):
+    cache = extract_cache()
+    if cache:
+        hit = cache.get(url)
+        if hit is not None:
+            return hit[0]
     try:
         r = requests.get(url, headers=HEADERS, timeout=15)
         r.raise_for_status()
-        return trafilatura.extract(r.text) or ""
+        text = trafilatura.extract(r.text) or ""
     except Exception:
-        return ""
+        return ""  # transient failures are not cached
+    if cache:
+        cache.put(url, text, {"final_url": r.url, "status": r.status_code, "html_bytes": len(r.content)})
+    return text
+
+
+def entry_summary(entry):
+    c = (entry.get("content") or [{}])[0].get("value", "")
+    return strip_html(c or getattr(entry, "summary", "") or getattr(entry, "description", ""))
 
 
 def get_content(entry, link):
     full = fetch_full_content(link)
     if full:
         return full.strip()
-    c = (entry.get("content") or [{}])[0].get("value", "")
-    return strip_html(c or getattr(entry, "summary", "") or getattr(entry, "description", ""))
+    return entry_summary(entry)
 
 
-def matches_topic(text):
-    t = (text or "").lower()
-    # Check if any keyword from any topic mapping is in the text
-    for major_topic, keywords in TOPIC_KEYWORDS.items():
-        if any(kw.lower() in t for kw in keywords):
-            return True
-    return False
+def fetch_feed(url, timeout=FEED_TIMEOUT, headers=None, stop=None):
+    """Download and parse one feed; the whole download must finish within `timeout` seconds.
 
-
-def fetch_feed(url):
+    `headers` may carry conditional-GET validators; a 304 returns an empty feed with status 304.
+    Setting the `stop` event abandons the download at the next chunk (returns None).
+    """
+    deadline = time.monotonic() + timeout
     try:
-        return feedparser.parse(url, request_headers={"User-Agent": "NewsBot/1.0"})
+        req_headers = {"User-Agent": "NewsBot/1.0", **(headers or {})}
+        with requests.get(url, headers=req_headers, timeout=timeout, stream=True) as r:
+            if r.status_code == 304:
+                return feedparser.FeedParserDict(status=304, entries=[], feed=feedparser.FeedParserDict())
+            r.raise_for_status()
+            # read1() returns whatever has arrived (urllib3 2), so the deadline is checked after
+            # every socket read rather than after a whole chunk a trickling server may never fill.
+            read1 = getattr(r.raw, "read1", None)
+            chunks = iter(lambda: read1(64 * 1024, decode_content=True), b"") if read1 else r.iter_content(8 * 1024)
+            body = b""
+            for chunk in chunks:
+                body += chunk
+                if stop is not None and stop.is_set():
+                    return None
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"feed deadline of {timeout:.1f}s exceeded")
+            # feedparser takes the charset (and Content-Location for relative links) from these.
+            response_headers = {k.lower(): v for k, v in r.headers.items()}
+        feed = feedparser.parse(body, response_headers=response_headers)
+        feed["status"] = r.status_code
+        feed["etag"] = r.headers.get("ETag")
+        feed["modified"] = r.headers.get("Last-Modified")
+        return feed
     except Exception as e:
         print(f"Error fetching {url}: {e}")
         return None
 
 
-def collect():
+def fetch_feeds(urls, state=None):
+    """Fetch feeds concurrently (one by one when FETCH_WORKERS <= 1), the whole scan within
+    SCAN_TIMEOUT. Returns parsed feeds in `urls` order (None for failures and skipped feeds).
+
+    With a FeedState, requests are conditional and unchanged feeds come back empty (status 304).
+    """
+    headers = {url: state.request_headers(url) if state else None for url in urls}
+    if FETCH_WORKERS <= 1:
+        deadline = time.monotonic() + SCAN_TIMEOUT
+        feeds = []
+        for i, url in enumerate(urls):
+            left = deadline - time.monotonic()
+            if left <= 0:
+                late = urls[i:]
+                print(f"[!] Scan deadline ({SCAN_TIMEOUT}s) reached, skipping {len(late)} slow feeds: {', '.join(late)}")
+                return feeds + [None] * len(late)
+            feeds.append(fetch_feed(url, timeout=min(FEED_TIMEOUT, left), headers=headers[url]))
+        return feeds
+    feeds = [None] * len(urls)
+    pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="feed")
+    futures = {pool.submit(METRICS.bind(fetch_feed), url, headers=headers[url]): i for i, url in enumerate(urls)}
+    try:
+        for fut in as_completed(futures, timeout=SCAN_TIMEOUT):
+            feeds[futures[fut]] = fut.result()
+    except FuturesTimeout:
+        late = [urls[i] for f, i in futures.items() if not f.done()]
+        print(f"[!] Scan deadline ({SCAN_TIMEOUT}s) reached, skipping {len(late)} slow feeds: {', '.join(late)}")
+    finally:
+        # Do not wait on stragglers; their per-feed deadline ends them shortly.
+        pool.shutdown(wait=False, cancel_futures=True)
+    return feeds
+
+
+def _is_recent(published):
+    # Year filter: Priority to 2026. Entries without a date are skipped for high authenticity.
+    return bool(published) and any(year in published for year in ["2026", "2027", "2028"])
+
+
+def _feed_candidates(url, feed, seen, seen_index=None):
+    """Stage 1 for one feed: recent, not yet used entries scored on title/summary topic hits.
+
+    `seen` holds links already taken from other feeds in this scan and is updated.
+    """
+    source = feed.feed.get("title", url)
+    candidates = []
+    for e in feed.entries:
+        link = getattr(e, "link", "")
+        if not link or link in seen:
+            continue
+        published = getattr(e, "published", "")
+        if not _is_recent(published):
+            continue
+        seen.add(link)
+        guid = entry_id(e)
+        if seen_index and seen_index.seen(link, guid):
+            continue
+        title = getattr(e, "title", "Untitled")
+        title_hits = MATCHER.counts(title)
+        summary_hits = MATCHER.counts(entry_summary(e))
+        candidates.append({
+            "entry": e,
+            "title": title,
+            "link": link,
+            "guid": guid,
+            "source": source,
+            "feed": url,
+            "published": published,
+            "score": 2 * sum(title_hits.values()) + sum(summary_hits.values()),
+            "hits": title_hits + title_hits + summary_hits,
+        })
+    return candidates
+
+
+def rank_candidates(feeds, seen_index=None):
+    """Stage 1: cheap filter on feed metadata only (no article downloads).
+
+    Stories already in `seen_index` (used by a previous run) are dropped here.
+    Returns candidates ranked by title/summary topic score, ties broken by SOURCES order.
+    """
     seen = set()
-    items = []
-    print(f"[+] Scanning {len(SOURCES)} high-authority sources...")
-    for url in SOURCES:
-        feed = fetch_feed(url)
+    candidates = []
+    for url, feed in zip(SOURCES, feeds):
         if not feed or not feed.entries:
             continue
-        source = feed.feed.get("title", url)
-        for e in feed.entries:
-            link = getattr(e, "link", "")
-            if not link or link in seen:
-                continue
-            
-            title = getattr(e, "title", "Untitled")
-            published = getattr(e, "published", "")
-            
-            # Year filter: Priority to 2026. If no year mentioned, we might accept it 
-            # if we are sure it's recent, but user requested strictness.
-            if published:
-                if not any(year in published for year in ["2026", "2027", "2028"]):
-                    continue
+        candidates.extend(_feed_candidates(url, feed, seen, seen_index))
+    # Stable sort keeps SOURCES priority among equally scored entries.
+    candidates.sort(key=lambda c: -c["score"])
+    return candidates
+
+
+def select_candidates(feeds, seen_index=None, state=None):
+    """rank_candidates() capped at MAX_NEWS_ITEMS x EXTRACT_OVERSAMPLE.
+
+    With a FeedState, entries cut by the cap are released so the next conditional scan sees them again.
+    """
+    candidates = rank_candidates(feeds, seen_index)
+    if not MAX_ITEMS:
+        return candidates
+    cap = MAX_ITEMS * EXTRACT_OVERSAMPLE
+    if state:
+        _release(state, candidates[cap:])
+    return candidates[:cap]
+
+
+def _release(state, candidates):
+    """Hand candidates that were never evaluated back to the feed state (see FeedState.release)."""
+    by_feed = {}
+    for c in candidates:
+        by_feed.setdefault(c["feed"], []).append(c["entry"])
+    for url, entries in by_feed.items():
+        state.release(url, entries)
+
+
+def _host(link):
+    return urlparse(link).netloc.lower()
+
+
+def _cached(candidate):
+    """Whether the candidate's article is already in the extract cache (looked up once)."""
+    if "cached" not in candidate:
+        cache = extract_cache()
+        candidate["cached"] = bool(cache) and cache.has(candidate["link"])
+    return candidate["cached"]
+
+
+def _busy_hosts(running):
+    """Host -> article downloads in progress among the `running` candidates."""
+    return Counter(_host(c["link"]) for c in running if not _cached(c))
+
+
+def _take_host_slot(candidate, busy):
+    """Claim one of the EXTRACT_PER_HOST slots of the candidate's host in `busy`, if one is free.
+
+    Scheduling happens before a task is submitted, so pool workers never sit waiting on a busy
+    host; cached articles need no download and always get through.
+    """
+    if _cached(candidate):
+        return True
+    host = _host(candidate["link"])
+    if busy[host] >= max(1, EXTRACT_PER_HOST):
+        return False
+    busy[host] += 1
+    return True
+
+
+def _extract(candidate, stop=None):
+    """Stage 2 worker: full-article extraction, then route the item to its best-matching topic.
+
+    Returns None without downloading once the `stop` event is set.
+    """
+    with METRICS.timer("article_extract"):
+        if stop is not None and stop.is_set():
+            return None
+        content = get_content(candidate["entry"], candidate["link"])
+    body_hits = MATCHER.counts(content)
+    if not candidate["score"] and not body_hits:
+        return None
+    return {
+        "title": candidate["title"],
+        "topic": MATCHER.best_topic(candidate["hits"] + body_hits),
+        "content": content,
+        "link": candidate["link"],
+        "guid": candidate["guid"],
+        "source": candidate["source"],
+        "published": candidate["published"],
+    }
+
+
+def extract_items(candidates, limit=MAX_ITEMS, dupes=None, evaluated=None):
+    """Stage 2: extract candidates in parallel, consumed in rank order; stops at `limit` items.
+
+    With a NearDuplicates, an item repeating a story already taken is folded into it (its
+    source listed under "also") and does not count towards `limit`. `evaluated`, if given,
+    receives every candidate whose result was looked at.
+    """
+    items = []
+    workers = max(1, EXTRACT_WORKERS)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+    # [candidate, future] in rank order, future None while its host has no free slot;
+    # results are taken from the head only.
+    pending = deque()
+    queue = iter(candidates)
+
+    def running():
+        return [f for _, f in pending if f is not None and not f.done()]
+
+    def refill():
+        # Keep every worker busy, but never hold more than `workers` extractions beyond what
+        # `limit` still needs, so we stop downloading once it is hit.
+        busy = _busy_hosts(c for c, f in pending if f is not None and not f.done())
+        room = workers - len(running())
+        if limit:
+            started = sum(1 for _, f in pending if f is not None)
+            room = min(room, limit - len(items) + workers - started)
+        if pending and pending[0][1] is None and not busy:
+            room = max(room, 1)  # nothing else is running: the head must be able to start
+        waiting = [e for e in pending if e[1] is None]
+        for entry in waiting:
+            if room <= 0:
+                return
+            if _take_host_slot(entry[0], busy):
+                entry[1] = pool.submit(METRICS.bind(_extract), entry[0])
+                room -= 1
+        waiting = sum(1 for e in waiting if e[1] is None)
+        # Candidates whose host is busy wait in place; look at most 4 x workers ahead for others.
+        while room > 0 and waiting < 4 * workers:
+            c = next(queue, None)
+            if c is None:
+                return
+            entry = [c, None]
+            pending.append(entry)
+            if _take_host_slot(c, busy):
+                entry[1] = pool.submit(METRICS.bind(_extract), c)
+                room -= 1
             else:
-                # If no date, we take a risk OR we skip. Let's skip for high authenticity.
-                continue
-                
-            content = get_content(e, link)
-            if not matches_topic(title) and not matches_topic(content):
+                waiting += 1
+
+    try:
+        refill()
+        while pending:
+            if pending[0][1] is None or not pending[0][1].done():
+                # A slow article, or one whose host is busy, at the head must not leave the
+                # other workers idle.
+                inflight = running()
+                if inflight:
+                    wait(inflight, return_when=FIRST_COMPLETED)
+                refill()
                 continue
-                
-            seen.add(link)
-            items.append({
-                "title": title,
-                "content": content,
-                "link": link,
-                "source": source,
-                "published": published,
-            })
-            if MAX_ITEMS and len(items) >= MAX_ITEMS:
+            c, fut = pending.popleft()
+            item = fut.result()
+            if evaluated is not None:
+                evaluated.append(c)
+            if item and not (dupes and dupes.add(item)):
+                items.append(item)
+            if limit and len(items) >= limit:
                 break
-        if MAX_ITEMS and len(items) >= MAX_ITEMS:
-            break
+            refill()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
     return items
 
 
-def run_once():
-    """Collect news once and save to OUTPUT_FILE."""
-    ts = datetime.now().isoformat()
-    items = collect()
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"fetched": ts, "items": items}, f, indent=2, ensure_ascii=False)
-    print(f"[+] News collected: {len(items)} items saved to {OUTPUT_FILE}")
+def collect(conditional=False):
+    """Collect topical news. With conditional=True, only entries new since the last
+    conditional scan are considered and unchanged feeds cost a single 304."""
+    print(f"[+] Scanning {len(SOURCES)} high-authority sources...")
+    state = FeedState(FEED_STATE_FILE) if conditional else None
+    # Fetch in parallel, but merge in SOURCES priority order so output is deterministic.
+    with METRICS.timer("feed_fetch"):
+        feeds = fetch_feeds(SOURCES, state)
+    METRICS.inc("feed_failed", sum(1 for f in feeds if not f))
+    if state:
+        unchanged = 0
+        for url, feed in zip(SOURCES, feeds):
+            if not feed:
+                continue
+            if feed.get("status") == 304:
+                unchanged += 1
+            else:
+                feed["entries"] = state.new_entries(url, feed)
+        METRICS.inc("feed_unchanged", unchanged)
+        print(f"[+] {unchanged} feeds unchanged since last scan")
+    seen_index = SeenIndex(SEEN_INDEX_FILE, SEEN_TTL_DAYS) if DEDUPE_ACROSS_RUNS else None
+    candidates = select_candidates(feeds, seen_index, state)
+    print(f"[+] {len(candidates)} candidates selected for full-text extraction")
+    dupes = NearDuplicates(NEAR_DUP_THRESHOLD) if NEAR_DUP_DEDUPE else None
+    evaluated = []
+    with METRICS.timer("extract"):
+        items = extract_items(candidates, dupes=dupes, evaluated=evaluated)
+    if state:
+        # Entries cut by the item limit stay new for the next conditional scan.
+        done = {id(c) for c in evaluated}
+        _release(state, [c for c in candidates if id(c) not in done])
+        state.save()
+    METRICS.inc("news_items", len(items))
+    if dupes and dupes.merged:
+        METRICS.inc("near_duplicates", dupes.merged)
+        print(f"[+] {dupes.merged} near-duplicate stories folded into {sum(1 for it in items if it.get('also'))} items")
+    cache = extract_cache()
+    if cache:
+        st = cache.stats()
+        print(f"[+] Extraction cache: {st['hits']} hits, {st['misses']} misses, {st['entries']} articles stored")
+    return items
+
+
+def stream_collect(conditional=False, limit=MAX_ITEMS, stop=None):
+    """Like collect(), but yields each item as soon as it is extracted and on-topic.
+
+    Feeds are fetched concurrently and their entries are extracted while slower feeds are
+    still downloading, best-scored candidate first among those seen so far (so the order is
+    by arrival rather than the global ranking collect() uses). Closing the generator, setting
+    `stop`, or reaching `limit` items cancels queued work and abandons feed downloads in
+    flight; an article already downloading is not interrupted but its result is dropped.
+    """
+    stop = stop or threading.Event()
+    started = time.monotonic()
+    state = FeedState(FEED_STATE_FILE) if conditional else None
+    seen_index = SeenIndex(SEEN_INDEX_FILE, SEEN_TTL_DAYS) if DEDUPE_ACROSS_RUNS else None
+    # Items are already out when a duplicate arrives, so those only gain an "also" citation.
+    dupes = NearDuplicates(NEAR_DUP_THRESHOLD, keep_first=True) if NEAR_DUP_DEDUPE else None
+    order = {url: i for i, url in enumerate(SOURCES)}
+    feed_pool = ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS), thread_name_prefix="feed")
+    extract_pool = ThreadPoolExecutor(max_workers=max(1, EXTRACT_WORKERS), thread_name_prefix="extract")
+    fetching = {
+        feed_pool.submit(METRICS.bind(fetch_feed), url, headers=state.request_headers(url) if state else None, stop=stop): url
+        for url in SOURCES
+    }
+    deadline = started + SCAN_TIMEOUT
+    ranked = []  # heap of (-score, SOURCES position, arrival, candidate)
+    arrival = itertools.count()
+    extracting = {}  # future -> candidate
+    links = set()
+    budget = limit * EXTRACT_OVERSAMPLE if limit else None  # extractions we are willing to start
+    yielded = failed = unchanged = 0
+    print(f"[+] Streaming news from {len(SOURCES)} high-authority sources...")
+    try:
+        while not stop.is_set():
+            busy = _busy_hosts(c for f, c in extracting.items() if not f.done())
+            deferred = []  # host busy: back on the heap, tried again once a download ends
+            while ranked and len(extracting) < max(1, EXTRACT_WORKERS) and budget != 0:
+                entry = heapq.heappop(ranked)
+                c = entry[-1]
+                if not _take_host_slot(c, busy):
+                    deferred.append(entry)
+                    continue
+                extracting[extract_pool.submit(METRICS.bind(_extract), c, stop)] = c
+                if budget:
+                    budget -= 1
+            for entry in deferred:
+                heapq.heappush(ranked, entry)
+            if not extracting and (not fetching or budget == 0):
+                break  # done, or out of extraction budget: feeds still downloading can't add items
+            timeout = max(0.0, deadline - time.monotonic()) if fetching else None
+            done, _ = wait(list(fetching) + list(extracting), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                late = list(fetching.values())
+                print(f"[!] Scan deadline ({SCAN_TIMEOUT}s) reached, skipping {len(late)} slow feeds: {', '.join(late)}")
+                fetching.clear()
+                continue
+            for fut in done:
+                if fut in fetching:
+                    url = fetching.pop(fut)
+                    feed = fut.result()
+                    if not feed:
+                        failed += 1
+                        continue
+                    if state:
+                        if feed.get("status") == 304:
+                            unchanged += 1
+                            continue
+                        feed["entries"] = state.new_entries(url, feed)
+                    for c in _feed_candidates(url, feed, links, seen_index):
+                        heapq.heappush(ranked, (-c["score"], order[url], next(arrival), c))
+                    continue
+                c = extracting.pop(fut)
+                item = fut.result()
+                if stop.is_set():
+                    extracting[fut] = c  # dropped: released below with the rest
+                    continue
+                if not item:
+                    continue
+                if dupes and dupes.add(item):
+                    continue
+                if not yielded:
+                    METRICS.observe("first_news_item", time.monotonic() - started)
+                yielded += 1
+                yield item
+                if limit and yielded >= limit:
+                    return
+    finally:
+        stop.set()
+        feed_pool.shutdown(wait=False, cancel_futures=True)
+        extract_pool.shutdown(wait=False, cancel_futures=True)
+        if state:
+            # Candidates never extracted (or dropped on stop) stay new for the next scan.
+            _release(state, [r[-1] for r in ranked] + list(extracting.values()))
+            state.save()
+        METRICS.observe("stream_collect", time.monotonic() - started)
+        METRICS.inc("feed_failed", failed)
+        METRICS.inc("feed_unchanged", unchanged)
+        METRICS.inc("news_items", yielded)
+        if dupes:
+            METRICS.inc("near_duplicates", dupes.merged)
+        print(f"[+] News stream closed after {yielded} items ({failed} feeds failed, {unchanged} unchanged)")
+
+
+class NewsStream:
+    """Collects news in a background thread (see stream_collect) so generation can start on the
+    first few items. The finished list is appended to the news store, as run_once() does."""
+
+    def __init__(self, conditional=False, limit=MAX_ITEMS):
+        self.items = []
+        self.done = False
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=METRICS.bind(self._run), args=(conditional, limit), name="news-stream", daemon=True)
+        self._thread.start()
+
+    def _run(self, conditional, limit):
+        stream = stream_collect(conditional, limit, self._stop)
+        try:
+            for item in stream:
+                with self._cond:
+                    self.items.append(item)
+                    self._cond.notify_all()
+        except Exception as e:
+            print(f"[!] News stream failed: {e}")
+        finally:
+            stream.close()
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+            if self.items:
+                save(self.items)
+
+    def wait(self, min_items, timeout=None):
+        """Items so far, once at least `min_items` have arrived, collection ended or `timeout` passed."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.done or len(self.items) >= min_items, timeout)
+            return list(self.items)
+
+    def result(self):
+        """All items, after collection finishes."""
+        self._thread.join()
+        return list(self.items)
+
+    def close(self):
+        """Stop collecting (outstanding fetches are cancelled) and return what arrived."""
+        self._stop.set()
+        return self.result()
+
+
+_store = None
+
+
+def news_store():
+    """The shared NewsStore for NEWS_STORE_FILE."""
+    global _store
+    if _store is None:
+        _store = NewsStore(NEWS_STORE_FILE, NEWS_STORE_MAX_ITEMS, NEWS_STORE_DAYS)
+    return _store
+
+
+def save(items):
+    """Append newly collected items to the news store and compact it. Returns how many were new."""
+    store = news_store()
+    added = store.append(items)
+    removed = store.compact()
+    print(f"[+] News store: {added} new, {removed} expired, {store.count()} items in {NEWS_STORE_FILE}")
+    return added
+
+
+def mark_used(items):
+    """Record stories a published post drew on (and the sources folded into them) in the seen
+    index, so later scans skip them for SEEN_TTL_DAYS."""
+    if not DEDUPE_ACROSS_RUNS or not items:
+        return
+    SeenIndex(SEEN_INDEX_FILE, SEEN_TTL_DAYS).add(items + [a for it in items for a in it.get("also", [])])
+
+
+def run_once(conditional=False):
+    """Collect news once and append it to the news store."""
+    items = collect(conditional)
+    save(items)
+    print(f"[+] News collected: {len(items)} items")
     return items
 
 def run():
     while True:
         ts = datetime.now().isoformat()
         print(f"\n--- {ts} ---")
-        items = collect()
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump({"fetched": ts, "items": items}, f, indent=2, ensure_ascii=False)
+        items = collect(conditional=True)
+        if not items:
+            print(f"\nNo new items. Next run in {INTERVAL_MINUTES} min")
+            time.sleep(INTERVAL_MINUTES * 60)
+            continue
+        save(items)
         for item in items:
             print(f"\n[{item['source']}] {item['title']}")
             print(f"  {item['content'][:200]}")
             print(f"  {item['link']}")
-        print(f"\nSaved to {OUTPUT_FILE}. Next run in {INTERVAL_MINUTES} min")
+        print(f"\nNext run in {INTERVAL_MINUTES} min")
         time.sleep(INTERVAL_MINUTES * 60)
 
 
@@ -2,7 +2,10 @@ import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
-OUTPUT_FILE = os.getenv("NEWS_OUTPUT") or str(BASE_DIR / "data" / "news.json")
+NEWS_STORE_FILE = os.getenv("NEWS_STORE_FILE") or str(BASE_DIR / "data" / "news.sqlite")
+FEED_STATE_FILE = os.getenv("FEED_STATE_FILE") or str(BASE_DIR / "data" / "feed_state.json")
+EXTRACT_CACHE_FILE = os.getenv("EXTRACT_CACHE_FILE") or str(BASE_DIR / "data" / "extract_cache.sqlite")
+SEEN_INDEX_FILE = os.getenv("SEEN_INDEX_FILE") or str(BASE_DIR / "data" / "seen_stories.sqlite")
 
 # High-Authority & High-Paid Categories
 TOPICS = [
@@ -52,6 +55,36 @@ SOURCES = [
     "https://feeds.npr.org/1001/rss.xml",
     "https://www.bloomberg.com/feed/podcast/bloomberg-news.xml"
 ]
+# NEWS_SOURCES (comma-separated feed URLs) replaces the list above, e.g. for local benchmarks.
+if os.getenv("NEWS_SOURCES"):
+    SOURCES = [u.strip() for u in os.getenv("NEWS_SOURCES").split(",") if u.strip()]
 
 MAX_ITEMS = int(os.getenv("MAX_NEWS_ITEMS", "15"))
 INTERVAL_MINUTES = int(os.getenv("INTERVAL_MINUTES", "60"))
+
+# Concurrent feed scanning (FETCH_WORKERS=1 scans sources one at a time)
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+FEED_TIMEOUT = float(os.getenv("FEED_TIMEOUT", "15"))  # seconds per feed
+SCAN_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", "45"))  # seconds for the whole scan
+
+# Full-article extraction (stage 2, only for the top-ranked candidates)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "8"))
+EXTRACT_PER_HOST = int(os.getenv("EXTRACT_PER_HOST", "2"))  # concurrent downloads per site
+EXTRACT_OVERSAMPLE = int(os.getenv("EXTRACT_OVERSAMPLE", "2"))  # candidates extracted = MAX_NEWS_ITEMS x this
+
+# Extracted-article cache (repeat runs skip download + trafilatura for known links)
+EXTRACT_CACHE = os.getenv("EXTRACT_CACHE", "true").lower() in ("1", "true", "yes")
+EXTRACT_CACHE_TTL_HOURS = float(os.getenv("EXTRACT_CACHE_TTL_HOURS", "72"))
+EXTRACT_CACHE_MAX_MB = float(os.getenv("EXTRACT_CACHE_MAX_MB", "200"))
+
+# Cross-run dedupe: stories a published post drew on are skipped for SEEN_TTL_DAYS
+DEDUPE_ACROSS_RUNS = os.getenv("DEDUPE_ACROSS_RUNS", "true").lower() in ("1", "true", "yes")
+SEEN_TTL_DAYS = float(os.getenv("SEEN_TTL_DAYS", "14"))
+
+# Near-duplicate stories (same event from several sources) collapse into one item citing all sources
+NEAR_DUP_DEDUPE = os.getenv("NEAR_DUP_DEDUPE", "true").lower() in ("1", "true", "yes")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.6"))  # estimated Jaccard of word 3-grams
+
+# Collected news history (append-only, compacted after every scan)
+NEWS_STORE_MAX_ITEMS = int(os.getenv("NEWS_STORE_MAX_ITEMS", "5000"))
+NEWS_STORE_DAYS = float(os.getenv("NEWS_STORE_DAYS", "30"))
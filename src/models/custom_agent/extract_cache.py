@@ -0,0 +1,98 @@
+"""On-disk cache of extracted article text, keyed by normalized URL (SQLite, TTL + LRU by size)."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "cmpid", "ocid", "at_medium", "at_campaign")
+
+
+def normalize_url(url):
+    """Canonical form: lowercase scheme/host, no fragment, tracking params dropped, query sorted."""
+    parts = urlsplit((url or "").strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+class ExtractCache:
+    def __init__(self, path, ttl_hours=72, max_mb=200):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, meta TEXT,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS articles_accessed ON articles(accessed)")
+        self._db.execute("DELETE FROM articles WHERE created < ?", (time.time() - self.ttl,))
+        self._db.commit()
+
+    def get(self, url):
+        """Return (text, meta) for a fresh entry, or None."""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, meta, created FROM articles WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[2] <= self.ttl:
+                self._db.execute("UPDATE articles SET accessed = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self.hits += 1
+                return row[0], json.loads(row[1] or "{}")
+            self.misses += 1
+        return None
+
+    def has(self, url):
+        """True if a fresh entry exists. Unlike get(), not counted as a hit and leaves LRU order alone."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created FROM articles WHERE key = ?", (normalize_url(url),)
+            ).fetchone()
+        return bool(row) and time.time() - row[0] <= self.ttl
+
+    def put(self, url, text, meta=None):
+        key = normalize_url(url)
+        text = text or ""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO articles (key, text, meta, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, text, json.dumps(meta or {}), len(text.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used rows until we are back under the budget.
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM articles ORDER BY accessed"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._db.executemany("DELETE FROM articles WHERE key = ?", doomed)
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM articles"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
@@ -0,0 +1,75 @@
+"""Persistent per-feed HTTP validators (ETag / Last-Modified) and last-seen entry IDs."""
+import json
+import os
+import threading
+
+MAX_IDS_PER_FEED = 500
+
+
+def entry_id(entry):
+    return entry.get("id") or entry.get("guid") or entry.get("link", "")
+
+
+class FeedState:
+    """JSON-backed store: {url: {"etag": ..., "modified": ..., "ids": [...]}}."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._previous = {}  # url -> validators before this scan's new_entries()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._feeds = json.load(f).get("feeds", {})
+            except (OSError, ValueError) as e:
+                print(f"[!] Ignoring unreadable feed state {path}: {e}")
+
+    def request_headers(self, url):
+        """Conditional-GET headers for url (empty on first fetch)."""
+        with self._lock:
+            st = self._feeds.get(url, {})
+        headers = {}
+        if st.get("etag"):
+            headers["If-None-Match"] = st["etag"]
+        if st.get("modified"):
+            headers["If-Modified-Since"] = st["modified"]
+        return headers
+
+    def new_entries(self, url, feed):
+        """Record the feed's validators and IDs; return only entries not seen on the previous fetch.
+
+        Fresh entries that end up not being evaluated must be handed back with release().
+        """
+        with self._lock:
+            st = self._feeds.setdefault(url, {})
+            known = set(st.get("ids", []))
+            fresh = [e for e in feed.entries if entry_id(e) not in known]
+            self._previous.setdefault(url, (st.get("etag"), st.get("modified")))
+            st["etag"] = feed.get("etag")
+            st["modified"] = feed.get("modified")
+            st["ids"] = [entry_id(e) for e in feed.entries][:MAX_IDS_PER_FEED]
+        return fresh
+
+    def release(self, url, entries):
+        """Forget entries that were never evaluated (cut by ranking or the item limit) so the next
+        scan offers them again. The feed's previous validators are restored, so that scan gets
+        the full feed rather than a 304."""
+        ids = {entry_id(e) for e in entries}
+        if not ids:
+            return
+        with self._lock:
+            st = self._feeds.get(url)
+            if st is None:
+                return
+            st["ids"] = [i for i in st.get("ids", []) if i not in ids]
+            st["etag"], st["modified"] = self._previous.get(url, (None, None))
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"feeds": self._feeds}, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
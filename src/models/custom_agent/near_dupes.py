@@ -0,0 +1,88 @@
+"""Near-duplicate story detection: the same event reported by several sources becomes one item.
+
+Each item gets a MinHash signature over the word 3-grams of its title and the lead of its
+extracted text; 3-grams rather than single words, so templated posts (the same scholarship
+blurb for another university) stay apart while copies of one story still match. Signatures are split into bands; two items are compared only when a whole band matches
+(LSH), so adding an item costs one signature plus a few bucket lookups and a run stays linear
+in the number of items.
+"""
+import hashlib
+import random
+
+from .topics import _words
+
+LEAD_WORDS = 80  # words of article text used next to the title
+SHINGLE_WORDS = 3
+_PRIME = (1 << 61) - 1
+
+
+def _shingles(item):
+    words = _words(item.get("title") or "") + _words(item.get("content") or "")[:LEAD_WORDS]
+    n = min(SHINGLE_WORDS, len(words))
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)} if words else set()
+
+
+def _hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+
+
+class NearDuplicates:
+    """Incremental clustering of collected items.
+
+    add() either registers an item as a new story or folds it into the story it duplicates:
+    the longer extracted text stays the representative (in place, so its list position and
+    citation number do not change) and the other source is listed under "also". With
+    keep_first, items already handed out are never rewritten; only "also" grows.
+    """
+
+    def __init__(self, threshold=0.6, perms=64, bands=16, keep_first=False):
+        # With r = perms / bands rows per band, pairs above ~(1/bands)^(1/r) Jaccard collide.
+        self.threshold = threshold
+        self.keep_first = keep_first
+        self.bands = bands
+        self.rows = perms // bands
+        rng = random.Random(2215587)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(self.rows * bands)]
+        self._buckets = {}  # (band, band values) -> [(signature, item)]
+        self.merged = 0
+
+    def signature(self, item):
+        hashes = [_hash(w) for w in _shingles(item)]
+        if not hashes:
+            return None
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def _similar(self, sig, other):
+        return sum(x == y for x, y in zip(sig, other)) / len(sig) >= self.threshold
+
+    def add(self, item):
+        """The representative `item` was merged into, or None if it is a new story (now registered)."""
+        sig = self.signature(item)
+        if sig is None:
+            return None
+        keys = [(b, sig[b * self.rows:(b + 1) * self.rows]) for b in range(self.bands)]
+        for key in keys:
+            for other_sig, rep in self._buckets.get(key, ()):
+                if self._similar(sig, other_sig):
+                    _merge(rep, item, self.keep_first)
+                    self.merged += 1
+                    return rep
+        for key in keys:
+            self._buckets.setdefault(key, []).append((sig, item))
+        return None
+
+
+def _citation(item):
+    return {k: item.get(k) for k in ("source", "title", "link", "guid")}
+
+
+def _merge(rep, item, keep_first=False):
+    """Fold `item` into `rep`, keeping whichever has the longer text as the representative."""
+    also = list(rep.get("also", []))
+    if not keep_first and len(item.get("content") or "") > len(rep.get("content") or ""):
+        also.append(_citation(rep))
+        rep.clear()
+        rep.update({k: v for k, v in item.items() if k != "also"})
+    else:
+        also.append(_citation(item))
+    rep["also"] = also + item.get("also", [])
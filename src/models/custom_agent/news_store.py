@@ -0,0 +1,146 @@
+"""Append-only news store: collected items go into SQLite indexed by topic and publish time,
+so each run only inserts what is new and readers can query or stream without loading it all."""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from .extract_cache import normalize_url
+
+COLUMNS = ("title", "topic", "content", "link", "guid", "source", "published")
+# Newest first by the later of publishing and insertion; ties go to the later date, then insert.
+NEWEST_FIRST = "MAX(published_ts, added) DESC, published_ts DESC, id DESC"
+
+
+def published_ts(published, default=None):
+    """Epoch seconds for an RSS (RFC 822) or ISO 8601 date string; `default` if it won't parse."""
+    if published:
+        for parse in (parsedate_to_datetime, datetime.fromisoformat):
+            try:
+                dt = parse(published.strip())
+            except (TypeError, ValueError, IndexError):
+                continue
+            if dt is None:
+                continue
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.timestamp()
+    return default
+
+
+class NewsStore:
+    def __init__(self, path, max_items=5000, max_days=30):
+        self.path = path
+        self.max_items = max_items
+        self.max_age = max_days * 86400
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Must be set before the first table exists; lets compact() hand freed pages back.
+        self._db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, published_ts REAL NOT NULL,"
+            " added REAL NOT NULL, title TEXT, topic TEXT, content TEXT, link TEXT, guid TEXT,"
+            " source TEXT, published TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_topic ON items (topic, published_ts)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_published ON items (published_ts)")
+        self._db.commit()
+
+    def append(self, items):
+        """Insert items not stored yet (matched on normalized link, else GUID). Returns how many."""
+        now = time.time()
+        rows = []
+        for item in items:
+            key = normalize_url(item["link"]) if item.get("link") else item.get("guid")
+            if not key:
+                continue
+            rows.append((key, published_ts(item.get("published"), now), now,
+                         *(item.get(c) for c in COLUMNS)))
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                f"INSERT OR IGNORE INTO items (key, published_ts, added, {', '.join(COLUMNS)})"
+                f" VALUES ({', '.join('?' * (3 + len(COLUMNS)))})",
+                rows,
+            )
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def compact(self):
+        """Drop items older than max_days and all but the newest max_items. Returns how many.
+
+        Age counts from the later of publishing and insertion, so an item collect() accepted with
+        an older date is kept for max_days rather than dropped by the run that stored it.
+        """
+        with self._lock:
+            before = self._db.total_changes
+            if self.max_age:
+                self._db.execute("DELETE FROM items WHERE MAX(published_ts, added) < ?", (time.time() - self.max_age,))
+            if self.max_items:
+                self._db.execute(
+                    f"DELETE FROM items WHERE id IN (SELECT id FROM items ORDER BY {NEWEST_FIRST}"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_items,),
+                )
+            removed = self._db.total_changes - before
+            self._db.commit()
+            if removed:
+                # executescript runs the pragma to completion; execute() would free a single page.
+                self._db.executescript("PRAGMA incremental_vacuum;")
+            return removed
+
+    def _query(self, topic=None, since=None, limit=None, added_since=None):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM items"
+        where, args = [], []
+        if topic:
+            where.append("topic = ?")
+            args.append(topic)
+        if since is not None:
+            where.append("published_ts >= ?")
+            args.append(since)
+        if added_since is not None:
+            where.append("added > ?")
+            args.append(added_since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {NEWEST_FIRST}"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return sql, args
+
+    def latest(self, n=15, topic=None, added_since=None):
+        """The `n` newest items (by the later of publishing and insertion), optionally for one
+        topic or only those stored after the epoch time `added_since`."""
+        sql, args = self._query(topic, limit=n, added_since=added_since)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [dict(zip(COLUMNS, r)) for r in rows]
+
+    def iter_items(self, topic=None, since=None, batch=100):
+        """Stream items newest first, `batch` rows per fetch, without loading the whole store.
+
+        Uses its own connection so a long read doesn't hold the lock writers need.
+        """
+        sql, args = self._query(topic, since)
+        db = sqlite3.connect(self.path)
+        try:
+            cur = db.execute(sql, args)
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                for r in rows:
+                    yield dict(zip(COLUMNS, r))
+        finally:
+            db.close()
+
+    def count(self, topic=None):
+        with self._lock:
+            if topic:
+                return self._db.execute("SELECT COUNT(*) FROM items WHERE topic = ?", (topic,)).fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM items").fetchone()[0]
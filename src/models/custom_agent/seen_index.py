@@ -0,0 +1,46 @@
+"""Cross-run index of stories already used by a published post (normalized link + GUID, with expiry)."""
+import os
+import sqlite3
+import threading
+import time
+
+from .extract_cache import normalize_url
+
+
+class SeenIndex:
+    def __init__(self, path, ttl_days=14):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS stories (key TEXT PRIMARY KEY, seen REAL NOT NULL)")
+        self._db.execute("DELETE FROM stories WHERE seen < ?", (time.time() - self.ttl,))
+        self._db.commit()
+
+    @staticmethod
+    def _keys(link, guid=None):
+        keys = ["url:" + normalize_url(link)] if link else []
+        if guid and guid != link:
+            keys.append("guid:" + guid)
+        return keys
+
+    def seen(self, link, guid=None):
+        keys = self._keys(link, guid)
+        if not keys:
+            return False
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT 1 FROM stories WHERE seen >= ? AND key IN ({','.join('?' * len(keys))}) LIMIT 1",
+                (cutoff, *keys),
+            ).fetchone()
+        return row is not None
+
+    def add(self, stories):
+        """Mark stories (dicts with "link" and optional "guid") as used."""
+        now = time.time()
+        rows = [(k, now) for s in stories for k in self._keys(s.get("link"), s.get("guid"))]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO stories (key, seen) VALUES (?, ?)", rows)
+            self._db.commit()
@@ -0,0 +1,78 @@
+"""Single-pass, word-boundary topic matcher built once from TOPIC_KEYWORDS."""
+import string
+from collections import Counter
+
+from .config import TOPIC_KEYWORDS
+
+# Punctuation -> space, so str.split() yields whole words (much faster than a \w+ regex scan).
+_SEPARATORS = str.maketrans({c: " " for c in string.punctuation + "\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u00ab\u00bb"})
+
+
+def _words(text):
+    return text.lower().translate(_SEPARATORS).split()
+
+
+class TopicMatcher:
+    """Tokenizes text once and looks keywords up by whole word, so "un" no longer matches "announced".
+
+    One C-level set intersection finds which keywords (plural "s" forms included) occur at
+    all; only those are counted. Multi-word keywords are only checked at positions where
+    their first word occurs.
+    """
+
+    def __init__(self, topic_keywords):
+        self._order = list(topic_keywords)
+        self._single = {}   # word -> [topics]
+        self._phrases = {}  # first word -> [(tuple of words, [topics])]
+        for topic, keywords in topic_keywords.items():
+            for kw in keywords:
+                words = tuple(_words(kw))
+                if len(words) == 1:
+                    self._single.setdefault(words[0], []).append(topic)
+                elif words:
+                    group = self._phrases.setdefault(words[0], [])
+                    for phrase, topics in group:
+                        if phrase == words:
+                            topics.append(topic)
+                            break
+                    else:
+                        group.append((words, [topic]))
+        # token -> topics it counts for; a keyword and its plural share the keyword's topics
+        self._lookup = {}
+        for word, topics in self._single.items():
+            for form in (word, word + "s"):
+                self._lookup.setdefault(form, []).extend(topics)
+        self._keys = frozenset(self._lookup).union(self._phrases)
+
+    def counts(self, text):
+        """{topic: keyword hits} for text; empty when nothing matches."""
+        hits = Counter()
+        if not text:
+            return hits
+        tokens = _words(text)
+        for tok in self._keys.intersection(tokens):
+            topics = self._lookup.get(tok)
+            if topics:
+                n = tokens.count(tok)
+                for topic in topics:
+                    hits[topic] += n
+            for phrase, topics in self._phrases.get(tok, ()):
+                size = len(phrase)
+                i = tokens.index(tok)
+                while True:
+                    tail = tokens[i + 1:i + size]
+                    if tuple(tail[:-1]) == phrase[1:-1] and tail and tail[-1] in (phrase[-1], phrase[-1] + "s"):
+                        for topic in topics:
+                            hits[topic] += 1
+                    try:
+                        i = tokens.index(tok, i + 1)
+                    except ValueError:
+                        break
+        return hits
+
+    def best_topic(self, hits):
+        """Topic with the most hits (first in TOPIC_KEYWORDS order on ties), or None."""
+        return max(self._order, key=lambda t: hits.get(t, 0)) if hits else None
+
+
+MATCHER = TopicMatcher(TOPIC_KEYWORDS)
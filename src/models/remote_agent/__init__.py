@@ -1,4 +1,6 @@
 """Remote AI models (OpenAI, Gemini)."""
-from .ai_providers import fetch_openai, fetch_gemini
+from .ai_providers import fetch_openai, fetch_gemini, call_stats, stream_stats, cached_response, cache_response
+from .router import ProviderRouter
+from .structured import parse_stats
 
-__all__ = ["fetch_openai", "fetch_gemini"]
+__all__ = ["fetch_openai", "fetch_gemini", "call_stats", "stream_stats", "cached_response", "cache_response", "parse_stats", "ProviderRouter"]
@@ -1,7 +1,19 @@
 """ChatGPT (OpenAI) and Gemini direct API integration."""
+import functools
 import json
 import os
 import re
+import threading
+import time
+from collections import deque
+
+from metrics import METRICS
+from .ratelimit import RateLimiter, call_with_backoff
+from .response_cache import ResponseCache, request_key
+from .structured import SCHEMAS, gemini_schema, parse, record, schema_for
+
+OPENAI_MODEL = 'gpt-4o-mini'
+GEMINI_MODEL = 'gemini-flash-latest'
 
 def _get_config():
     try:
@@ -10,6 +22,36 @@ def _get_config():
     except ImportError:
         return 15, 1000, 12000, 4096, "- General"
 
+def _get_cache_config():
+    try:
+        from config import AI_CACHE, AI_CACHE_FILE, AI_CACHE_TTL_HOURS, AI_CACHE_MAX_MB
+        return AI_CACHE, AI_CACHE_FILE, AI_CACHE_TTL_HOURS, AI_CACHE_MAX_MB
+    except ImportError:
+        return False, None, 0, 0
+
+def _get_stream_config():
+    try:
+        from config import AI_STREAM, AI_STREAM_OVERRUN
+        return AI_STREAM, AI_STREAM_OVERRUN
+    except ImportError:
+        return False, 0
+
+def _get_structured_config():
+    try:
+        from config import AI_STRUCTURED
+        return AI_STRUCTURED
+    except ImportError:
+        return True
+
+def _get_rate_config(provider):
+    """(requests/min, tokens/min, max retries) for provider; 0 quotas mean unlimited."""
+    try:
+        import config
+        prefix = provider.upper()
+        return getattr(config, f"{prefix}_RPM", 0), getattr(config, f"{prefix}_TPM", 0), config.AI_MAX_RETRIES
+    except (ImportError, AttributeError):
+        return 0, 0, 2
+
 def _transform_query(q):
     secs, sec_words, post_words, _, _ = _get_config()
     q = (q or '').strip()
@@ -49,95 +91,334 @@ JSON Formats:
 - Section/Post: {"title":"...","content":"HTML...","labels":["l1","l2"]}
 Return ONLY JSON. No conversational text."""
 
-def _parse_json(text):
-    if not text:
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(provider, key):
+    """One SDK client per (provider, key) per process; its HTTP connection pool is shared by all
+    callers (the OpenAI and google-genai clients are safe to use from several threads)."""
+    with _clients_lock:
+        client = _clients.get((provider, key))
+        if client is None:
+            if provider == 'openai':
+                from openai import OpenAI
+                # Retries are ours (call_with_backoff), so they respect the shared rate limiter.
+                client = OpenAI(api_key=key, max_retries=0)
+            else:
+                from google import genai
+                client = genai.Client(api_key=key)
+            _clients[(provider, key)] = client
+        return client
+
+
+_limiters = {}
+_local = threading.local()  # tokens the last call on this thread actually used (see _usage)
+
+
+def _limited(provider, request, prompt_chars, max_tokens):
+    """Run request() within the provider's quotas, retrying 429/5xx with backoff."""
+    rpm, tpm, retries = _get_rate_config(provider)
+    with _clients_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = RateLimiter(rpm, tpm)
+    # Reserve conservatively (~4 chars per prompt token plus the full completion budget), then
+    # settle against the usage the API reports.
+    tokens = prompt_chars // 4 + max_tokens
+    _local.used = None
+    with METRICS.timer("ai_call", provider=provider):
+        result = call_with_backoff(request, limiter, tokens, retries=retries, name=provider)
+    if _local.used is not None:
+        limiter.settle(tokens, _local.used)
+    return result
+
+
+_response_cache = None
+
+
+def _cache():
+    """Process-wide ResponseCache, or None when AI_CACHE is off."""
+    global _response_cache
+    enabled, path, ttl_hours, max_mb = _get_cache_config()
+    if not enabled:
         return None
-    text = text.strip()
-    
-    # Try to find JSON block in markdown
-    json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL | re.IGNORECASE)
-    if json_match:
-        text = json_match.group(1).strip()
-    else:
-        # Try generic code block
-        code_match = re.search(r'```\s*(.*?)\s*```', text, re.DOTALL | re.IGNORECASE)
-        if code_match:
-            text = code_match.group(1).strip()
-        else:
-            # If no code blocks, try to find the start of JSON
-            try:
-                start = text.index('{')
-                end = text.rindex('}') + 1
-                text = text[start:end].strip()
-            except ValueError:
+    with _clients_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(path, ttl_hours, max_mb)
+        return _response_cache
+
+
+def _query_key(query, salt=None):
+    """Cache key for a router-level query: the prompt both providers would be sent, its settings,
+    and `salt` (set when identical prompts must still get separate answers)."""
+    _, _, _, max_tok, categories = _get_config()
+    return request_key('router', [OPENAI_MODEL, GEMINI_MODEL], _system_prompt(categories), _transform_query(query),
+                       {'max_tokens': max_tok, 'structured': _get_structured_config(), 'salt': salt})
+
+
+def cached_response(query, salt=None):
+    """The cached parsed response for `query`, or None (also when AI_CACHE is off)."""
+    cache = _cache()
+    if not cache:
+        return None
+    hit = cache.get(_query_key(query, salt))
+    if hit is not None:
+        METRICS.inc("ai_cache_hit")
+    return hit
+
+
+def cache_response(query, result, salt=None):
+    """Store a complete response; salvaged (cut-off) replies are never cached."""
+    cache = _cache()
+    if cache and result and not result.get('salvaged'):
+        cache.put(_query_key(query, salt), result)
+
+
+# Per-call streaming stats, oldest first.
+_call_stats = deque(maxlen=1000)
+_call_stats_lock = threading.Lock()
+
+
+def call_stats():
+    """Snapshot of recorded calls: provider, ttft (s), elapsed (s), tokens, tokens_per_sec, aborted."""
+    with _call_stats_lock:
+        return list(_call_stats)
+
+
+def stream_stats():
+    """{provider: {calls, ttft_p50, tokens_per_sec_p50, aborted}} over the recorded streamed calls."""
+    by_provider = {}
+    for st in call_stats():
+        by_provider.setdefault(st['provider'], []).append(st)
+
+    def median(values):
+        values = sorted(v for v in values if v is not None)
+        return values[len(values) // 2] if values else None
+
+    return {
+        name: {
+            'calls': len(calls),
+            'ttft_p50': median(c['ttft'] for c in calls),
+            'tokens_per_sec_p50': median(c['tokens_per_sec'] for c in calls),
+            'aborted': sum(1 for c in calls if c['aborted']),
+        }
+        for name, calls in by_provider.items()
+    }
+
+
+_VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'source', 'wbr', 'col', 'area', 'base', 'embed', 'track'}
+
+
+def _close_tags(html):
+    """Append closing tags for elements left open in a truncated HTML fragment."""
+    stack = []
+    for m in re.finditer(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*?(/?)>', html):
+        closing, name, selfclose = m.group(1), m.group(2).lower(), m.group(3)
+        if selfclose or name in _VOID_TAGS:
+            continue
+        if not closing:
+            stack.append(name)
+        elif name in stack:
+            while stack and stack.pop() != name:
                 pass
+    return html + ''.join(f'</{name}>' for name in reversed(stack))
+
+
+def _salvage_section(text):
+    """Recover title/content from a section response cut off mid-JSON (content trimmed to the last tag)."""
+    def field(name, closed=True):
+        m = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)%s' % (name, '"' if closed else ''), text, re.DOTALL)
+        return m.group(1) if m else None
 
+    raw = field('content', closed=False)
+    if not raw:
+        return None
+    if raw.rfind('<') > raw.rfind('>'):
+        raw = raw[:raw.rfind('<')]  # drop a half-written tag
+    else:
+        raw = raw[:raw.rfind(' ') + 1] or raw  # drop a half-written word
+    if (len(raw) - len(raw.rstrip('\\'))) % 2:
+        raw = raw[:-1]  # dangling escape
     try:
-        # strict=False allows control characters like newlines in strings
-        return json.loads(text, strict=False)
-    except json.JSONDecodeError:
-        # Fix common issues like single quotes for keys or missing quotes
-        try:
-            # Replace single quotes on keys with double quotes
-            fixed = re.sub(r'([{,]\s*)\'([a-zA-Z0-9_]+)\'\s*:', r'\1"\2":', text)
-            # Replace unquoted keys
-            fixed = re.sub(r'([{,]\s*)([a-zA-Z0-9_]+)\s*:', r'\1"\2":', fixed)
-            return json.loads(fixed, strict=False)
-        except Exception:
-            return None
+        content = json.loads(f'"{raw}"', strict=False)
+        title = json.loads(f'"{field("title")}"', strict=False) if field('title') else None
+    except ValueError:
+        return None
+    data = {'content': _close_tags(content.rstrip()), 'labels': []}
+    if title:
+        data['title'] = title
+    return data
+
+
+def _usage(provider, usage, prompt_chars, text):
+    """Record (prompt, completion) token counts reported by the API, estimated when missing."""
+    prompt, completion = usage or (None, None)
+    prompt = prompt or prompt_chars // 4
+    completion = completion or len(text) // 4
+    METRICS.add_tokens(provider, prompt, completion)
+    _local.used = prompt + completion
+    return completion
+
+
+def _consume_stream(provider, stream, text_of, usage_of, word_limit, schema, prompt_chars):
+    """Assemble a streamed completion, aborting on a non-JSON opening or once it runs past `word_limit` words."""
+    start = time.monotonic()
+    ttft = None
+    parts = []
+    words = 0
+    usage = None
+    aborted = None
+    opened = False
+    try:
+        for chunk in stream:
+            usage = usage_of(chunk) or usage
+            delta = text_of(chunk)
+            if not delta:
+                continue
+            if ttft is None:
+                ttft = time.monotonic() - start
+            parts.append(delta)
+            if not opened:
+                head = ''.join(parts).lstrip()
+                if head:
+                    if head[0] not in '{[`':
+                        aborted = 'malformed'
+                        break
+                    opened = True
+            words += delta.count(' ')
+            if word_limit and words > word_limit:
+                aborted = 'overrun'
+                break
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+    text = ''.join(parts).strip()
+    elapsed = time.monotonic() - start
+    tokens = _usage(provider, usage, prompt_chars, text)
+    stat = {
+        'provider': provider, 'ttft': ttft, 'elapsed': elapsed, 'tokens': tokens,
+        'tokens_per_sec': tokens / elapsed if elapsed else 0.0, 'aborted': aborted,
+    }
+    with _call_stats_lock:
+        _call_stats.append(stat)
+    if ttft is not None:
+        METRICS.observe("ai_ttft", ttft, provider=provider)
+    if aborted:
+        print(f"[!] {provider} stream aborted ({aborted}) after {elapsed:.1f}s, ~{tokens} tokens")
+    if aborted == 'malformed' or not text:
+        record(provider, 'unparseable')
+        return None
+    if aborted == 'overrun':
+        data = _salvage_section(text)
+        record(provider, 'salvaged' if data else 'unparseable')
+        if data:
+            data['salvaged'] = True
+        return data
+    return parse(text, schema, provider)
+
+
+def _word_limit(msg):
+    """Streaming cut-off for section prompts, AI_STREAM_OVERRUN x a section's share of the post
+    (SECTION_WORDS, or BLOG_POST_MAX_WORDS / OUTLINE_SECTIONS if larger); None = no limit.
+
+    With the default SECTION_WORDS (100) alone, ordinary sections would be cut and posts would
+    stay under BLOG_POST_MIN_WORDS.
+    """
+    secs, sec_words, post_words, _, _ = _get_config()
+    _, overrun = _get_stream_config()
+    if overrun and msg.startswith('[MODE: SECTION_ONLY]'):
+        return int(max(sec_words, post_words / max(1, secs)) * overrun)
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def _system_prompt(categories):
+    # Inject dynamic categories
+    return SYSTEM.replace("{!!CATEGORIES!!}", categories)
+
 
 def fetch_openai(query):
     key = os.getenv('OPENAI_API_KEY', '').strip()
     if not key:
         return None
     try:
-        from openai import OpenAI
         _, _, _, max_tok, categories = _get_config()
-        client = OpenAI(api_key=key)
+        client = _client('openai', key)
+        session_system = _system_prompt(categories)
         
-        # Inject dynamic categories
-        session_system = SYSTEM.replace("{!!CATEGORIES!!}", categories)
-        
-        msg = _transform_query(query)
-        r = client.chat.completions.create(
-            model='gpt-4o-mini',
-            messages=[{'role': 'system', 'content': session_system}, {'role': 'user', 'content': msg + '\n\nReturn ONLY JSON. No conversational text.'}],
-            temperature=0.3,
-            max_tokens=max_tok
-        )
-        text = (r.choices[0].message.content or '').strip()
-        return _parse_json(text) if text else None
+        msg = _transform_query(query) + '\n\nReturn ONLY JSON. No conversational text.'
+        schema = schema_for(msg)
+        params = {'temperature': 0.3, 'max_tokens': max_tok}
+        if _get_structured_config():
+            params['response_format'] = {
+                'type': 'json_schema',
+                'json_schema': {'name': schema, 'schema': SCHEMAS[schema], 'strict': True},
+            }
+
+        messages = [{'role': 'system', 'content': session_system}, {'role': 'user', 'content': msg}]
+        prompt_chars = len(session_system) + len(msg)
+
+        def request():
+            if _get_stream_config()[0]:
+                stream = client.chat.completions.create(
+                    model=OPENAI_MODEL, messages=messages, stream=True,
+                    stream_options={'include_usage': True}, **params
+                )
+                return _consume_stream(
+                    'openai', stream,
+                    lambda c: c.choices[0].delta.content if c.choices else None,
+                    lambda c: (c.usage.prompt_tokens, c.usage.completion_tokens) if c.usage else None,
+                    _word_limit(msg), schema, prompt_chars,
+                )
+            r = client.chat.completions.create(model=OPENAI_MODEL, messages=messages, **params)
+            text = (r.choices[0].message.content or '').strip()
+            _usage('openai', (r.usage.prompt_tokens, r.usage.completion_tokens) if r.usage else None, prompt_chars, text)
+            return parse(text, schema, 'openai')
+
+        return _limited('openai', request, prompt_chars, max_tok)
     except Exception as e:
         print(f"[!] OpenAI failed: {e}")
         return None
 
+def _gemini_usage(response):
+    meta = response.usage_metadata
+    return (meta.prompt_token_count, meta.candidates_token_count) if meta else None
+
 def fetch_gemini(query):
     key = os.getenv('GEMINI_API_KEY', '').strip()
     if not key:
         return None
     try:
-        from google import genai
-        client = genai.Client(api_key=key)
         _, _, _, max_tok, categories = _get_config()
-        
-        # Inject dynamic categories
-        session_system = SYSTEM.replace("{!!CATEGORIES!!}", categories)
+        client = _client('gemini', key)
+        session_system = _system_prompt(categories)
         
         msg = _transform_query(query) + '\n\nReturn ONLY JSON.'
-        
-        r = client.models.generate_content(
-            model='gemini-flash-latest',
-            contents=msg,
-            config={
-                'system_instruction': session_system,
-                'temperature': 0.3,
-                'max_output_tokens': max_tok,
-                'response_mime_type': 'application/json'
-            }
-        )
-        
-        text = (r.text or '').strip()
-        return _parse_json(text) if text else None
+        schema = schema_for(msg)
+        params = {'temperature': 0.3, 'max_output_tokens': max_tok, 'response_mime_type': 'application/json'}
+        if _get_structured_config():
+            params['response_schema'] = gemini_schema(SCHEMAS[schema])
+
+        config = {'system_instruction': session_system, **params}
+        prompt_chars = len(session_system) + len(msg)
+
+        def request():
+            if _get_stream_config()[0]:
+                stream = client.models.generate_content_stream(model=GEMINI_MODEL, contents=msg, config=config)
+                return _consume_stream(
+                    'gemini', stream,
+                    lambda c: c.text,
+                    _gemini_usage,
+                    _word_limit(msg), schema, prompt_chars,
+                )
+            r = client.models.generate_content(model=GEMINI_MODEL, contents=msg, config=config)
+            text = (r.text or '').strip()
+            _usage('gemini', _gemini_usage(r), prompt_chars, text)
+            return parse(text, schema, 'gemini')
+
+        return _limited('gemini', request, prompt_chars, max_tok)
     except Exception as e:
         print(f"[!] Gemini failed: {e}")
         return None
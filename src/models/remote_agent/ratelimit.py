@@ -0,0 +1,127 @@
+"""Client-side per-provider quotas (token buckets) and Retry-After aware exponential backoff."""
+import random
+import threading
+import time
+
+from metrics import METRICS
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth. 0 = unlimited."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, n, now):
+        """Seconds until `n` units are available (0 if they can be taken now)."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        n = min(n, self.capacity)
+        return 0.0 if self.tokens >= n else (n - self.tokens) / self.rate
+
+    def take(self, n):
+        if self.capacity:
+            self.tokens -= min(n, self.capacity)
+
+    def give(self, n, now):
+        """Return `n` units (negative: charge them), never above capacity."""
+        if self.capacity:
+            self._refill(now)
+            self.tokens = min(self.capacity, self.tokens + n)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets for one provider, plus a shared pause after a 429."""
+
+    def __init__(self, rpm=0, tpm=0):
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until one request carrying ~`tokens` tokens fits in both quotas."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self._paused_until - now,
+                    self._requests.wait_time(1, now),
+                    self._tokens.wait_time(tokens, now),
+                )
+                if wait <= 0:
+                    self._requests.take(1)
+                    self._tokens.take(tokens)
+                    return
+            time.sleep(wait)
+
+    def settle(self, reserved, used):
+        """Correct a reservation of `reserved` tokens once the call reports `used`: refund the
+        unused part, or charge the shortfall when the estimate was too low."""
+        with self._lock:
+            self._tokens.give(min(reserved, self._tokens.capacity) - used, time.monotonic())
+
+    def pause(self, seconds):
+        """Hold every caller of this provider for `seconds` (server asked us to back off)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def status_of(exc):
+    """HTTP status carried by an OpenAI / google-genai SDK error, if any."""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after(exc):
+    """Seconds from a Retry-After (or retry-after-ms) response header, if present."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def call_with_backoff(fn, limiter, tokens, retries=3, base_delay=2.0, max_delay=60.0, name="provider"):
+    """Run fn() under `limiter`, retrying 429/5xx with full-jitter exponential backoff.
+
+    A Retry-After header overrides the computed delay and pauses the whole provider.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            return fn()
+        except Exception as e:
+            status = status_of(e)
+            if status not in RETRYABLE_STATUS or attempt >= retries:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            else:
+                delay = min(max_delay, delay) + random.uniform(0, 1)
+            if status == 429:
+                limiter.pause(delay)
+            attempt += 1
+            METRICS.inc("ai_retry", provider=name, status=status)
+            print(f"[~] {name} returned {status}; retry {attempt}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
@@ -0,0 +1,180 @@
+"""Provider router: rolling latency/error stats, per-provider circuit breaker, optional hedged requests."""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from metrics import METRICS
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class _Health:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)  # (latency seconds, ok)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.calls = 0
+        self.failures = 0
+        self.hedges = 0
+
+    def percentile(self, p):
+        lat = sorted(s[0] for s in self.samples if s[1])
+        if not lat:
+            return None
+        return lat[min(len(lat) - 1, int(p * len(lat)))]
+
+
+class ProviderRouter:
+    """Calls `providers` ([(name, fn)] in priority order; fn(query) -> dict or None) with failover.
+
+    A provider whose last `failures` calls all failed is skipped for `cooldown` seconds, then gets
+    a single trial call (half-open). With `hedge` on, a request still running after the primary's
+    rolling p95 latency (at least `hedge_min_delay`) is also sent to the next provider; the first
+    usable answer wins.
+    """
+
+    def __init__(self, providers, failures=3, cooldown=60.0, hedge=False, hedge_min_delay=10.0,
+                 window=50, log=print):
+        self.providers = list(providers)
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.log = log
+        self._health = {name: _Health(window) for name, _ in self.providers}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ai-hedge") if hedge else None
+
+    # --- breaker bookkeeping -------------------------------------------------
+
+    def _available(self, name):
+        """Closed, or open long enough that a half-open trial call is due."""
+        with self._lock:
+            h = self._health[name]
+            if h.state == OPEN and time.monotonic() - h.opened_at >= self.cooldown:
+                h.state = HALF_OPEN
+                h.trial_running = False
+                self.log(f"[~] {name}: circuit half-open, next call is a trial")
+            return h.state == CLOSED or (h.state == HALF_OPEN and not h.trial_running)
+
+    def _admit(self, name):
+        """Claim the right to call `name` now; a half-open provider admits a single trial."""
+        with self._lock:
+            h = self._health[name]
+            if h.state == CLOSED:
+                return True
+            if h.state == HALF_OPEN and not h.trial_running:
+                h.trial_running = True
+                return True
+            return False
+
+    def _record(self, name, latency, ok):
+        with self._lock:
+            h = self._health[name]
+            h.calls += 1
+            h.samples.append((latency, ok))
+            if ok:
+                h.consecutive_failures = 0
+                if h.state != CLOSED:
+                    self.log(f"[+] {name}: circuit closed")
+                h.state = CLOSED
+                return
+            h.failures += 1
+            h.consecutive_failures += 1
+            if h.state == HALF_OPEN or h.consecutive_failures >= self.failures:
+                if h.state != OPEN:
+                    self.log(f"[!] {name}: circuit open for {self.cooldown:.0f}s "
+                             f"after {h.consecutive_failures} consecutive failures")
+                    METRICS.inc("ai_circuit_open", provider=name)
+                h.state = OPEN
+                h.opened_at = time.monotonic()
+                h.trial_running = False
+
+    def _timed(self, name, fn, query, force=False):
+        if not force and not self._admit(name):
+            return None
+        start = time.monotonic()
+        try:
+            result = fn(query)
+        except Exception as e:
+            self.log(f"[!] {name} raised: {e}")
+            result = None
+        self._record(name, time.monotonic() - start, bool(result))
+        return result
+
+    # --- routing -------------------------------------------------------------
+
+    def _candidates(self):
+        """(providers to try in priority order, force); force bypasses breakers when all are open."""
+        available = [(n, fn) for n, fn in self.providers if self._available(n)]
+        if available:
+            return available, False
+        return list(self.providers), True
+
+    def call(self, query):
+        candidates, force = self._candidates()
+        if self.hedge and len(candidates) > 1:
+            return self._hedged(candidates, query, force)
+        for n, (name, fn) in enumerate(candidates, 1):
+            result = self._timed(name, fn, query, force)
+            if result:
+                return result
+            if n < len(candidates):
+                METRICS.inc("ai_fallback", provider=name)
+        return None
+
+    def _hedge_delay(self, name):
+        with self._lock:
+            p95 = self._health[name].percentile(0.95)
+        return max(self.hedge_min_delay, p95 or 0.0)
+
+    def _hedged(self, candidates, query, force):
+        (first, first_fn), rest = candidates[0], list(candidates[1:])
+        names = {self._pool.submit(METRICS.bind(self._timed), first, first_fn, query, force): first}
+        done, pending = wait(names, timeout=self._hedge_delay(first))
+        for fut in done:
+            if fut.result():
+                return fut.result()
+        while rest:
+            name, fn = rest.pop(0)
+            if not done:
+                with self._lock:
+                    self._health[first].hedges += 1
+                METRICS.inc("ai_hedge", provider=first)
+                self.log(f"[~] {first} slower than its p95; hedging with {name}")
+            else:
+                for fut in done:
+                    METRICS.inc("ai_fallback", provider=names[fut])
+            fut = self._pool.submit(METRICS.bind(self._timed), name, fn, query, force)
+            names[fut] = name
+            pending.add(fut)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut.result():
+                        return fut.result()
+                if rest:
+                    break  # a call failed: bring in the next provider alongside any still running
+        return None
+
+    # --- observability -------------------------------------------------------
+
+    def snapshot(self):
+        """{provider: {state, calls, failures, error_rate, p50, p95, hedges}} over the rolling window."""
+        out = {}
+        with self._lock:
+            for name, h in self._health.items():
+                window_errors = sum(1 for _, ok in h.samples if not ok)
+                out[name] = {
+                    "state": h.state,
+                    "calls": h.calls,
+                    "failures": h.failures,
+                    "error_rate": window_errors / len(h.samples) if h.samples else 0.0,
+                    "p50": h.percentile(0.5),
+                    "p95": h.percentile(0.95),
+                    "hedges": h.hedges,
+                }
+        return out
@@ -0,0 +1,208 @@
+"""Structured output: outline/post JSON schemas, a linear-time tolerant JSON extractor, a small
+validator, and per-provider parse outcome counters."""
+import json
+import threading
+from collections import Counter
+
+from metrics import METRICS
+
+OUTLINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "topic": {"type": "string"},
+        "sections": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["topic", "sections"],
+    "additionalProperties": False,
+}
+
+POST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "content": {"type": "string"},
+        "labels": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "content", "labels"],
+    "additionalProperties": False,
+}
+
+SCHEMAS = {"outline": OUTLINE_SCHEMA, "post": POST_SCHEMA}
+# Fields a response is useless without; other missing fields get empty defaults.
+ESSENTIAL = {"outline": ("sections",), "post": ("content",)}
+
+
+def schema_for(prompt):
+    """Schema name for a transformed prompt ([MODE: OUTLINE] -> outline, anything else -> post)."""
+    return "outline" if prompt.startswith("[MODE: OUTLINE]") else "post"
+
+
+def gemini_schema(schema):
+    """`schema` without keywords Gemini's response_schema does not accept."""
+    if isinstance(schema, dict):
+        return {k: gemini_schema(v) for k, v in schema.items() if k != "additionalProperties"}
+    return schema
+
+
+# --- tolerant extraction -------------------------------------------------------
+
+def _object_span(text):
+    """(start, end) of the first balanced {...} in text, honouring strings; None if it never closes."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, quote, escape = 0, None, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if quote:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return start, i + 1
+    return None
+
+
+def _repair(text):
+    """One pass over almost-JSON: single-quoted strings become double-quoted, bare keys get
+    quoted and trailing commas are dropped."""
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in "\"'":
+            j = i + 1
+            buf = []
+            while j < n and text[j] != c:
+                if text[j] == "\\" and j + 1 < n:
+                    if c == "'" and text[j + 1] == "'":
+                        buf.append("'")
+                    else:
+                        buf.append(text[j:j + 2])
+                    j += 2
+                    continue
+                buf.append('\\"' if c == "'" and text[j] == '"' else text[j])
+                j += 1
+            out.append('"' + "".join(buf) + '"')
+            i = j + 1
+        elif c.isalpha() or c == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            k = j
+            while k < n and text[k] in " \t\r\n":
+                k += 1
+            word = text[i:j]
+            out.append(f'"{word}"' if k < n and text[k] == ":" else word)
+            i = j
+        elif c == ",":
+            k = i + 1
+            while k < n and text[k] in " \t\r\n":
+                k += 1
+            if k < n and text[k] in "}]":
+                i += 1  # trailing comma
+                continue
+            out.append(c)
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def extract_json(text):
+    """(object, repaired) from a model reply that may wrap the JSON in prose or ``` fences.
+
+    Each step is a single left-to-right scan. Returns (None, False) when no complete object
+    can be recovered.
+    """
+    if not text:
+        return None, False
+    span = _object_span(text)
+    if not span:
+        return None, False
+    candidate = text[span[0]:span[1]]
+    try:
+        return json.loads(candidate, strict=False), False
+    except ValueError:
+        pass
+    try:
+        return json.loads(_repair(candidate), strict=False), True
+    except ValueError:
+        return None, False
+
+
+# --- validation ----------------------------------------------------------------
+
+_TYPES = {"string": str, "array": list, "object": dict}
+_DEFAULTS = {"string": "", "array": list, "object": dict}
+
+
+def validate(data, name):
+    """Data checked and normalised against SCHEMAS[name], or None if an essential field is
+    missing or has the wrong type. Unknown keys are kept; non-string array items are dropped."""
+    if not isinstance(data, dict):
+        return None
+    schema = SCHEMAS[name]
+    for key, spec in schema["properties"].items():
+        kind = spec["type"]
+        value = data.get(key)
+        if not isinstance(value, _TYPES[kind]):
+            if key in ESSENTIAL[name]:
+                return None
+            default = _DEFAULTS[kind]
+            data[key] = default() if callable(default) else default
+            continue
+        if kind == "array":
+            data[key] = [v for v in value if isinstance(v, str)]
+    for key in ESSENTIAL[name]:
+        if not data[key]:
+            return None
+    return data
+
+
+# --- metrics -------------------------------------------------------------------
+
+OUTCOMES = ("ok", "repaired", "salvaged", "invalid", "unparseable")
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(provider, outcome):
+    with _stats_lock:
+        _stats[(provider, outcome)] += 1
+    METRICS.inc("ai_reply", provider=provider, outcome=outcome)
+
+
+def parse(text, name, provider):
+    """Extract and validate a `name` response from `provider`, counting the outcome."""
+    data, repaired = extract_json(text)
+    if data is None:
+        record(provider, "unparseable")
+        return None
+    data = validate(data, name)
+    record(provider, "invalid" if data is None else "repaired" if repaired else "ok")
+    return data
+
+
+def parse_stats():
+    """{provider: {ok, repaired, salvaged, invalid, unparseable, responses, failure_rate}}."""
+    with _stats_lock:
+        items = dict(_stats)
+    out = {}
+    for provider in sorted({p for p, _ in items}):
+        row = {o: items.get((provider, o), 0) for o in OUTCOMES}
+        row["responses"] = sum(row.values())
+        failed = row["invalid"] + row["unparseable"]
+        row["failure_rate"] = failed / row["responses"] if row["responses"] else 0.0
+        out[provider] = row
+    return out